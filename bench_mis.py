@@ -0,0 +1,165 @@
+import argparse
+import datetime
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+import openpyxl
+import pandas as pd
+
+from mis_consolidate import consolidate_models
+from mis_export import build_styled_export
+from mis_format import format_pl_frame
+from mis_loader import load_sheet_models, pl_sheet_names
+from mis_numeric import split_frame
+from mis_render import cell_comment_ids, grid_document, style_table
+from mis_snapshot import ingest_workbook, load_snapshot_models
+from mis_styles import compile_row_styles
+from mis_synthetic import generate_workbook
+from mis_xlsx import read_comment_index, read_hidden_indexes
+
+BENCH_VERSION = 1
+DEFAULT_CASES = ('70x12', '250x36', '600x120')
+
+
+def _time(fn, repeat):
+    runs = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        runs.append(time.perf_counter() - start)
+    return result, {'min': min(runs), 'median': statistics.median(runs), 'runs': runs}
+
+
+def run_case(path, repeat=3):
+    """Time every dashboard stage on the workbook at ``path``; returns ``{stage: timings}``."""
+    stages = {}
+    sheet = pl_sheet_names(path)[0]
+
+    def stage(name, fn):
+        result, stages[name] = _time(fn, repeat)
+        return result
+
+    def read_values():
+        with pd.ExcelFile(path, engine='openpyxl') as xls:
+            return xls.parse(sheet)
+
+    values = stage('read_values', read_values)
+    stage('hidden_indexes', lambda: read_hidden_indexes(path, sheet))
+    stage('comment_index', lambda: read_comment_index(path, sheet))
+    models = stage('sheet_models', lambda: load_sheet_models(path))
+
+    with tempfile.TemporaryDirectory() as snap_dir:
+        stage('snapshot_ingest', lambda: ingest_workbook(path, snap_dir))
+        stage('snapshot_read', lambda: load_snapshot_models(path, snap_dir))
+
+    model = models[sheet]
+    all_styles = stage('row_styles', lambda: compile_row_styles(model.numbers['PARTICULARS']))
+    row_styles = all_styles[model.visible_rows]
+    stage('numeric_split', lambda: split_frame(values))
+    frame = model.numbers_at(model.visible_rows, model.visible_col_positions)
+    notes = model.notes_at(model.visible_rows, model.visible_col_positions)
+    schema = model.visible_schema()
+    formatted = stage('format', lambda: format_pl_frame(frame, schema, notes))
+    # The old BeautifulSoup tooltip pass is now a re-key of the comment map
+    # plus attributes written by the table template during to_html()
+    comments, comment_ids = stage('comment_mapping', lambda: (
+        (c := model.comments_at(model.visible_rows, model.visible_col_positions)), cell_comment_ids(c),
+    ))
+    stage('styler_html', lambda: style_table(formatted, row_styles, comments, schema).to_html(
+        escape=False, cell_comments=comment_ids,
+    ))
+    stage('grid_document', lambda: grid_document(formatted, row_styles, comments, schema))
+    stage('styled_export', lambda: build_styled_export(
+        model.visible_frame(include_comment_cols=True), row_styles,
+        schema=model.visible_schema(include_comment_cols=True),
+    ))
+    stage('consolidate', lambda: consolidate_models(models))
+    return stages
+
+
+def _environment():
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'openpyxl': openpyxl.__version__,
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Stages whose median is more than ``tolerance`` slower than the baseline."""
+    old = {case['name']: case['stages'] for case in baseline['cases']}
+    regressions = []
+    for case in results['cases']:
+        for name, timing in case['stages'].items():
+            before = old.get(case['name'], {}).get(name)
+            if before and timing['median'] > before['median'] * (1 + tolerance):
+                regressions.append((case['name'], name, before['median'], timing['median']))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Time each MIS dashboard stage on synthetic workbooks.')
+    parser.add_argument('--case', action='append', dest='cases',
+                        help='ROWSxMONTHS workbook size (repeatable; default: %s)' % ', '.join(DEFAULT_CASES))
+    parser.add_argument('--branches', type=int, default=4, help='P&L sheets per workbook')
+    parser.add_argument('--hidden-rows', type=float, default=0.05)
+    parser.add_argument('--hidden-cols', type=float, default=0.5)
+    parser.add_argument('--comment-density', type=float, default=0.01)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--out', default='bench_results.json', help='where to write the results')
+    parser.add_argument('--compare', help='baseline results to check against')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed slowdown before a stage is flagged')
+    args = parser.parse_args(argv)
+
+    results = {
+        'version': BENCH_VERSION,
+        'created': datetime.datetime.now().isoformat(timespec='seconds'),
+        'environment': _environment(),
+        'cases': [],
+    }
+    with tempfile.TemporaryDirectory() as work_dir:
+        for name in args.cases or DEFAULT_CASES:
+            rows, months = (int(part) for part in name.lower().split('x'))
+            params = {
+                'rows': rows, 'months': months, 'branches': args.branches,
+                'hidden_rows': args.hidden_rows, 'hidden_cols': args.hidden_cols,
+                'comment_density': args.comment_density,
+            }
+            path = os.path.join(work_dir, f'bench_{name}.xlsx')
+            generate_workbook(
+                path, branches=[f'B{idx}' for idx in range(args.branches)], rows=rows, months=months,
+                hidden_rows=args.hidden_rows, hidden_cols=args.hidden_cols,
+                comment_density=args.comment_density,
+            )
+            params['file_bytes'] = os.path.getsize(path)
+            stages = run_case(path, args.repeat)
+            results['cases'].append({'name': name, 'params': params, 'stages': stages})
+            print(f'{name}:')
+            for stage, timing in stages.items():
+                print(f'  {stage:<16} {timing["median"] * 1000:9.1f} ms')
+
+    with open(args.out, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=1)
+    print(f'results written to {args.out}')
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for case, stage, before, after in regressions:
+            print(f'REGRESSION {case} {stage}: {before * 1000:.1f} ms -> {after * 1000:.1f} ms')
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,26 +1,34 @@
-import openpyxl
-
-# Load the Excel file
-wb = openpyxl.load_workbook('c:/Users/ADMIN/Python/Sales_dashboard/Bomba Profitability/Bomba Foods-MIS.xlsx')
-ws = wb['P&L (Niko)']
-
-# Check for comments in the worksheet
-comments_found = []
-for row in range(1, ws.max_row + 1):
-    for col in range(1, ws.max_column + 1):
-        cell = ws.cell(row=row, column=col)
-        if cell.comment:
-            comments_found.append({
-                'row': row,
-                'col': col,
-                'comment': cell.comment.text,
-                'value': cell.value
-            })
-
-print(f'Found {len(comments_found)} cells with comments')
-for comment in comments_found[:5]:  # Show first 5 comments
-    print(f'Cell {comment["row"]},{comment["col"]}: {comment["value"]} -> {comment["comment"][:50]}...')
-
-# Also check sheet dimensions
-print(f'Worksheet max row: {ws.max_row}')
-print(f'Worksheet max column: {ws.max_column}')
+import argparse
+
+from mis_xlsx import read_comment_index, sheet_parts
+
+
+def _cell_ref(row, col):
+    letters = ''
+    col += 1
+    while col:
+        col, rem = divmod(col - 1, 26)
+        letters = chr(65 + rem) + letters
+    return f'{letters}{row + 1}'
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='List the cell comments in an MIS workbook.')
+    parser.add_argument('workbook', help='XLSX file to inspect')
+    parser.add_argument('--sheet', action='append', dest='sheets',
+                        help='sheet to inspect (repeatable; default: every sheet)')
+    parser.add_argument('--limit', type=int, default=None,
+                        help='show at most this many comments per sheet')
+    args = parser.parse_args(argv)
+
+    sheets = args.sheets or list(sheet_parts(args.workbook))
+    for sheet in sheets:
+        comments = read_comment_index(args.workbook, sheet)
+        print(f'{sheet}: found {len(comments)} cells with comments')
+        for (row, col), text in sorted(comments.items())[:args.limit]:
+            text = ' '.join(text.split())
+            print(f'  {_cell_ref(row, col)} ({row + 1},{col + 1}): {text[:50]}{"..." if len(text) > 50 else ""}')
+
+
+if __name__ == '__main__':
+    main()
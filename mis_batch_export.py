@@ -0,0 +1,116 @@
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from mis_consolidate import CONSOLIDATED_NAME, consolidate_models
+from mis_export import build_styled_export, export_file_name
+from mis_loader import find_workbooks, load_sheet_models
+from mis_styles import compile_row_styles
+
+
+def export_sheet(model, row_styles):
+    """``(file name, bytes)`` of the styled download for one sheet, as the dashboard builds it."""
+    frame = model.visible_frame(include_comment_cols=True)
+    schema = model.visible_schema(include_comment_cols=True)
+    data = build_styled_export(frame, row_styles[model.visible_rows], schema=schema)
+    return export_file_name(model.name, schema), data
+
+
+def export_workbook(path, out_dir, sheet_names=None, consolidated=False):
+    """Write the styled export of every P&L sheet in ``path`` into ``out_dir``.
+
+    Returns a report dict with the written files and the load / export
+    seconds, so the caller can print timings from any worker process.
+    """
+    start = time.perf_counter()
+    models = load_sheet_models(path, sheet_names)
+    if consolidated and models:
+        models[CONSOLIDATED_NAME] = consolidate_models(models)
+    loaded = time.perf_counter()
+
+    os.makedirs(out_dir, exist_ok=True)
+    outputs = []
+    for name, model in models.items():
+        sheet_start = time.perf_counter()
+        file_name, data = export_sheet(model, compile_row_styles(model.numbers['PARTICULARS']))
+        out_path = os.path.join(out_dir, file_name)
+        with open(out_path, 'wb') as f:
+            f.write(data)
+        outputs.append({'sheet': name, 'path': out_path, 'seconds': time.perf_counter() - sheet_start})
+
+    end = time.perf_counter()
+    return {
+        'workbook': path,
+        'outputs': outputs,
+        'load_seconds': loaded - start,
+        'export_seconds': end - loaded,
+        'seconds': end - start,
+    }
+
+
+def export_all(paths, out_root, sheet_names=None, consolidated=False, max_workers=None):
+    """Export every workbook in ``paths`` across a process pool.
+
+    Each workbook writes into ``<out_root>/<workbook name>/`` so two MIS
+    files for the same month cannot overwrite each other. Yields
+    ``(path, report, error)`` as workbooks finish.
+    """
+    def out_dir(path):
+        return os.path.join(out_root, os.path.splitext(os.path.basename(path))[0])
+
+    if max_workers == 1 or len(paths) < 2:
+        for path in paths:
+            try:
+                yield path, export_workbook(path, out_dir(path), sheet_names, consolidated), None
+            except Exception as exc:
+                yield path, None, exc
+        return
+
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        futures = {
+            pool.submit(export_workbook, path, out_dir(path), sheet_names, consolidated): path
+            for path in paths
+        }
+        for future in as_completed(futures):
+            path = futures[future]
+            try:
+                yield path, future.result(), None
+            except Exception as exc:
+                yield path, None, exc
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Write the styled P&L export for a batch of MIS workbooks.')
+    parser.add_argument('inputs', nargs='+', help='XLSX files or directories of them')
+    parser.add_argument('--out', default='exports', help='output root; one folder per workbook (default: exports)')
+    parser.add_argument('--sheet', action='append', dest='sheets',
+                        help='sheet to export (repeatable; default: every P&L sheet)')
+    parser.add_argument('--consolidated', action='store_true',
+                        help=f"also export the '{CONSOLIDATED_NAME}' sum of the branch sheets")
+    parser.add_argument('--workers', type=int, help='worker processes (default: one per CPU)')
+    args = parser.parse_args(argv)
+
+    paths = find_workbooks(args.inputs)
+    if not paths:
+        parser.error('no .xlsx workbooks found')
+
+    start = time.perf_counter()
+    failed = 0
+    for path, report, error in export_all(paths, args.out, args.sheets, args.consolidated, args.workers):
+        if error is not None:
+            failed += 1
+            print(f'{path}: FAILED {type(error).__name__}: {error}')
+            continue
+        print(f"{path}: {len(report['outputs'])} files in {report['seconds'] * 1000:.0f} ms "
+              f"(load {report['load_seconds'] * 1000:.0f} ms, export {report['export_seconds'] * 1000:.0f} ms)")
+        for output in report['outputs']:
+            print(f"  {output['sheet']:<16} {output['seconds'] * 1000:7.0f} ms  {output['path']}")
+    print(f'{len(paths) - failed}/{len(paths)} workbooks exported in {time.perf_counter() - start:.2f} s')
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
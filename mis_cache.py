@@ -0,0 +1,289 @@
+import os
+import sys
+import threading
+import weakref
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from mis_loader import SheetModel, pl_sheet_names, reload_sheet_models
+from mis_snapshot import file_digest, load_snapshot_models, update_snapshot
+from mis_xlsx import changed_sheets, member_crcs, sheet_dependencies
+
+# Memory budget, in MB, of the shared workbook cache (default 512)
+CACHE_MB_ENV = 'MIS_CACHE_MB'
+DEFAULT_CACHE_MB = 512
+
+_MISSING = object()
+
+
+def cache_budget(env=CACHE_MB_ENV, default_mb=DEFAULT_CACHE_MB):
+    """Byte budget from the ``env`` variable (in MB), or ``default_mb``."""
+    try:
+        mb = float(os.environ.get(env, default_mb))
+    except ValueError:
+        mb = default_mb
+    return int(mb * (1 << 20))
+
+
+def estimate_nbytes(value, _seen=None):
+    """Approximate memory held by ``value``, following frames, arrays, containers and object attributes.
+
+    Objects reachable twice (e.g. a model shared by two dicts) are counted once.
+    """
+    seen = set() if _seen is None else _seen
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        usage = value.memory_usage(deep=True, index=True)
+        return int(usage.sum() if isinstance(usage, pd.Series) else usage)
+    if isinstance(value, np.ndarray):
+        size = value.nbytes
+        if value.dtype == object:
+            size += sum(estimate_nbytes(item, seen) for item in value.ravel())
+        return size
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(
+            estimate_nbytes(k, seen) + estimate_nbytes(v, seen) for k, v in value.items()
+        )
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return sys.getsizeof(value) + sum(estimate_nbytes(item, seen) for item in value)
+    if hasattr(value, '__dict__') and not isinstance(value, type):
+        # Models, schemas, period tables: attributes plus anything memoized
+        # on the instance (cached_property results)
+        return sys.getsizeof(value) + estimate_nbytes(dict(vars(value)), seen)
+    return sys.getsizeof(value)
+
+
+class MemoryLRU:
+    """Thread-safe LRU bounded by the estimated memory of its values, with hit/miss counts.
+
+    ``put`` evicts least recently used entries until the total fits
+    ``max_bytes`` again; the entry just stored is never the one evicted, so
+    a single value larger than the budget still serves until it is
+    replaced. ``sizeof`` measures a value once, when it is stored, so
+    values should be complete by then.
+    """
+
+    def __init__(self, max_bytes, sizeof=estimate_nbytes):
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None, record=True):
+        """Cached value for ``key`` (now most recently used), else ``default``.
+
+        ``record=False`` looks without counting a hit or miss, for a
+        second check after waiting on a build.
+        """
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+            if entry is _MISSING:
+                if record:
+                    self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            if record:
+                self.hits += 1
+            return entry[0]
+
+    def put(self, key, value):
+        """Store ``value`` and return the keys evicted to make room for it."""
+        size = self.sizeof(value)
+        evicted = []
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.nbytes -= old[1]
+            self._entries[key] = (value, size)
+            self.nbytes += size
+            while self.nbytes > self.max_bytes and len(self._entries) > 1:
+                old_key, (_, old_size) = self._entries.popitem(last=False)
+                self.nbytes -= old_size
+                self.evictions += 1
+                evicted.append(old_key)
+        return evicted
+
+    def pop(self, key):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                return None
+            self.nbytes -= entry[1]
+            return entry[0]
+
+    def keys(self):
+        with self._lock:
+            return list(self._entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+
+    def stats(self):
+        """Entries, memory and hit/miss counters, for display or logging."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'mb': round(self.nbytes / (1 << 20), 1),
+                'budget_mb': round(self.max_bytes / (1 << 20), 1),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else None,
+                'evictions': self.evictions,
+            }
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class WorkbookCache:
+    """Memory-bounded LRU of parsed workbook artifacts shared by every session.
+
+    Entries are keyed by ``(path, mtime, sha256, name)`` and hold immutable
+    models, so any number of sessions read the same objects. The content
+    hash is only recomputed when the file's mtime or size changes, so a
+    warm lookup costs one ``os.stat`` and no Excel I/O. ``max_bytes``
+    defaults to ``MIS_CACHE_MB``; ``stats()`` reports hits, misses and
+    evictions.
+    """
+
+    def __init__(self, max_bytes=None):
+        self._entries = MemoryLRU(cache_budget() if max_bytes is None else max_bytes)
+        self._digests = {}
+        self._lock = threading.Lock()
+        self._build_locks = {}
+        # path -> (sha256, member CRCs, sheet count, {sheet name: model}) of the
+        # last full model set, so a changed workbook only reparses the sheets
+        # whose parts changed. Models are held weakly: the 'sheet_models'
+        # entry charges them to the budget, and once it is evicted they are
+        # not kept alive here
+        self._loaded = {}
+        # path -> {sheet name: 'data' | 'comments'} applied by the last reload
+        self.last_changes = {}
+        # Paths invalidated explicitly: the next build re-reads the XLSX
+        # instead of trusting the on-disk snapshot
+        self._refresh = set()
+
+    def file_key(self, path):
+        """Return ``(path, mtime_ns, sha256)`` for the current file contents."""
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        with self._lock:
+            memo = self._digests.get(path)
+        if memo is None or memo[:2] != (stat.st_mtime_ns, stat.st_size):
+            memo = (stat.st_mtime_ns, stat.st_size, file_digest(path))
+            with self._lock:
+                self._digests[path] = memo
+        return (path, memo[0], memo[2])
+
+    def get_or_build(self, path, name, builder):
+        """Return the cached artifact ``name`` for ``path``, building it on a miss.
+
+        ``builder`` is called with the workbook path. Concurrent misses on the
+        same key wait for a single build instead of parsing twice.
+        """
+        key = self.file_key(path) + (name,)
+        value = self._entries.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        with self._lock:
+            build_lock = self._build_locks.setdefault(key, threading.Lock())
+        with build_lock:
+            try:
+                value = self._entries.get(key, _MISSING, record=False)
+                if value is not _MISSING:
+                    return value
+                value = builder(key[0])
+                # Memoized lookups are built before the value is measured, so the
+                # budget sees models as the sessions will use them
+                models = value.values() if isinstance(value, dict) else [value]
+                for model in models:
+                    if isinstance(model, SheetModel):
+                        model.warm()
+                # A new version of the file replaces every older entry for it
+                for stale in [k for k in self._entries.keys() if k[0] == key[0] and k[1:3] != key[1:3]]:
+                    self._entries.pop(stale)
+                self._entries.put(key, value)
+            finally:
+                # Also after a failed build (half-saved workbook), so the lock is not kept forever
+                with self._lock:
+                    self._build_locks.pop(key, None)
+        return value
+
+    def get_sheet_models(self, path):
+        """``{sheet name: SheetModel}`` for every P&L sheet, ingested in parallel on a miss.
+
+        When an earlier version of the workbook was loaded in this process,
+        a miss compares zip member CRCs with it and reparses only the
+        sheets (or comment parts) that changed.
+        """
+        return self.get_or_build(path, 'sheet_models', self._build_sheet_models)
+
+    def _build_sheet_models(self, path):
+        digest = self.file_key(path)[2]
+        crcs = member_crcs(path)
+        with self._lock:
+            loaded = self._loaded.get(path)
+            refresh = path in self._refresh
+            self._refresh.discard(path)
+        previous = dict(loaded[3]) if loaded is not None else {}
+        if loaded is None or len(previous) < loaded[2]:
+            # No earlier version, or its models were evicted and collected
+            models = load_snapshot_models(path, digest=digest, refresh=refresh)
+            changes = {name: 'data' for name in models}
+        else:
+            base_digest, base_crcs = loaded[:2]
+            changes = changed_sheets(base_crcs, crcs, sheet_dependencies(path, pl_sheet_names(path)))
+            models = reload_sheet_models(path, previous, changes)
+            update_snapshot(path, models, changed=changes, digest=digest, base_digest=base_digest)
+        with self._lock:
+            self._loaded[path] = (digest, crcs, len(models), weakref.WeakValueDictionary(models))
+            self.last_changes[path] = changes
+        return models
+
+    def invalidate(self, path=None):
+        """Drop cached entries for ``path``, or everything when no path is given.
+
+        The next load of an invalidated workbook re-reads the XLSX and
+        rewrites its snapshot rather than reading the snapshot back.
+        """
+        if path is None:
+            self._entries.clear()
+            with self._lock:
+                self._refresh.update(self._digests)
+                self._refresh.update(self._loaded)
+                self._digests.clear()
+                self._loaded.clear()
+            return
+        path = os.path.abspath(path)
+        for key in [k for k in self._entries.keys() if k[0] == path]:
+            self._entries.pop(key)
+        with self._lock:
+            self._refresh.add(path)
+            self._digests.pop(path, None)
+            self._loaded.pop(path, None)
+
+    def stats(self):
+        return self._entries.stats()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+# Module-level instance: Streamlit imports this module once per server
+# process, so every session and browser tab shares the same entries.
+workbook_cache = WorkbookCache()
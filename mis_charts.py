@@ -0,0 +1,36 @@
+import pandas as pd
+
+
+def _month_as_text(df):
+    # Plotly treats 'YYYY-MM' strings as categories, matching the sheet's months
+    if 'Month' in df.columns and pd.api.types.is_datetime64_any_dtype(df['Month']):
+        df['Month'] = df['Month'].dt.strftime('%Y-%m')
+    return df
+
+
+def branch_frame(models):
+    """Every branch sheet stacked into one frame with a ``Branch`` column."""
+    frames = []
+    for branch, model in models.items():
+        df = _month_as_text(model.numbers.copy())
+        df['Branch'] = branch
+        frames.append(df)
+    return pd.concat(frames, ignore_index=True)
+
+
+def trend_figures(models):
+    """Sales and profit trend figures for the branch sheets that carry them.
+
+    plotly is only imported when there is something to plot.
+    """
+    full_df = branch_frame(models)
+    specs = [
+        ('Sale', 'Niko Monthly Sales Trend'),
+        ('Profit', 'Niko Monthly Profit Trend'),
+    ]
+    specs = [(y, title) for y, title in specs if 'Month' in full_df.columns and y in full_df.columns]
+    if not specs:
+        return []
+    import plotly.express as px
+
+    return [px.line(full_df, x='Month', y=y, title=title) for y, title in specs]
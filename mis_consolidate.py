@@ -0,0 +1,117 @@
+import numpy as np
+import pandas as pd
+
+from mis_format import net_profit_position
+from mis_loader import SheetModel, label_key
+from mis_numeric import number_block, split_frame
+
+CONSOLIDATED_NAME = 'All branches'
+
+
+def _merge_order(key_lists):
+    """Union of several ordered key lists, keeping each list's relative order.
+
+    A key first seen in a later list is placed right after the key that
+    precedes it in that list.
+    """
+    order = []
+    for keys in key_lists:
+        prev = -1
+        for key in keys:
+            if key in order:
+                prev = order.index(key)
+            else:
+                prev += 1
+                order.insert(prev, key)
+    return order
+
+
+def _month_blocks(model):
+    """``[(month, value position, percent position or None)]`` for a branch sheet, in sheet order."""
+    blocks = []
+    for info in model.schema:
+        if info.is_month:
+            pct = model.schema.percent_after(info)
+            blocks.append((info.month, info.position, None if pct is None else pct.position))
+    return blocks
+
+
+def _branch_body(model):
+    """Keyed value and implied-base frames for the rows up to NET PROFIT."""
+    labels = pd.Series(model.particulars[:len(model.numbers)], dtype=object)
+    np_idx = net_profit_position(labels)
+    top = len(labels) if np_idx is None else np_idx + 1
+    rows = np.flatnonzero((labels.iloc[:top] != '').to_numpy())
+    keys = labels.iloc[rows].map(label_key)
+    # Repeated labels within one sheet stay separate lines
+    keys = (keys + '#' + keys.groupby(keys).cumcount().astype(str)).to_list()
+
+    blocks = _month_blocks(model)
+    months = [month for month, _, _ in blocks]
+    numbers = model.numbers.iloc[rows]
+    values = number_block(numbers, [pos for _, pos, _ in blocks])
+    pct = np.full(values.shape, np.nan)
+    with_pct = [i for i, (_, _, p) in enumerate(blocks) if p is not None]
+    pct[:, with_pct] = number_block(numbers, [blocks[i][2] for i in with_pct])
+    # Each sheet expresses a line as a share of its own base (net sale, food
+    # sales, ...); value / share recovers that base so shares can be re-pooled
+    valid = np.isfinite(values) & np.isfinite(pct) & (pct != 0)
+    bases = np.where(valid, values / np.where(valid, pct, 1), np.nan)
+    shared = np.where(valid, values, np.nan)
+
+    frame = lambda arr: pd.DataFrame(arr, index=keys, columns=months)
+    labels_by_key = dict(zip(keys, labels.iloc[rows]))
+    return labels_by_key, frame(values), frame(shared), frame(bases)
+
+
+def consolidate_models(models, name=CONSOLIDATED_NAME):
+    """Sum every branch P&L into one SheetModel.
+
+    Lines are matched on their label (case and spacing ignored) and months
+    on their date. Amounts are summed across branches; percentage columns
+    are re-pooled as total amount over total base, so each line keeps the
+    meaning it has in the branch sheets. Lines below NET PROFIT (notes and
+    disbursements) are branch-specific and left out. A month is hidden when
+    every branch that has it hides it.
+    """
+    bodies = [_branch_body(model) for model in models.values()]
+    order = _merge_order([list(labels) for labels, _, _, _ in bodies])
+    labels = {}
+    for branch_labels, _, _, _ in bodies:
+        for key, label in branch_labels.items():
+            labels.setdefault(key, label)
+
+    months = sorted({month for _, values, _, _ in bodies for month in values.columns})
+
+    def pooled(idx):
+        stacked = pd.concat([body[idx] for body in bodies])
+        return stacked.groupby(level=0, sort=False).sum(min_count=1).reindex(index=order, columns=months)
+
+    values, shared, bases = pooled(1), pooled(2), pooled(3)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        pct = (shared / bases).where(bases != 0)
+
+    visible_months = set()
+    for model in models.values():
+        hidden = set(model.hidden_cols)
+        visible_months.update(month for month, pos, _ in _month_blocks(model) if pos not in hidden)
+
+    columns = {'PARTICULARS': [labels[key] for key in order]}
+    hidden_cols = []
+    for idx, month in enumerate(months):
+        if month not in visible_months:
+            hidden_cols.extend([1 + 2 * idx, 2 + 2 * idx])
+        columns[month.to_pydatetime()] = values[month].to_numpy()
+        columns['%' if idx == 0 else f'%.{idx}'] = pct[month].to_numpy()
+    data = pd.DataFrame(columns)
+    numbers, notes = split_frame(data)
+
+    return SheetModel(
+        name=name,
+        numbers=numbers,
+        notes=notes,
+        hidden_rows=[],
+        hidden_cols=hidden_cols,
+        comments={},
+        particulars=[str(label).strip() for label in data['PARTICULARS']],
+    )
@@ -0,0 +1,240 @@
+import datetime
+import io
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from mis_cache import MemoryLRU
+from mis_schema import ColumnSchema, resolve_columns
+
+# openpyxl is imported by build_styled_export() so the dashboard and other
+# readers of this module do not pay for it until a workbook is written
+
+INDIAN_NUMBER_FMT = '#,##,##0'
+PERCENT_FMT = '0.00%'
+DEFAULT_COMPANY = 'Niko Foods LLP'
+DEFAULT_SHEET = 'P&L (Niko)'
+
+
+def export_file_name(sheet_name, columns, company=DEFAULT_COMPANY, default_sheet=DEFAULT_SHEET):
+    """Download name ``P&L - <company> - <Mon-YY>.xlsx`` for the latest month in ``columns``.
+
+    ``columns`` are the exported column labels or their ColumnSchema.
+    Sheets other than ``default_sheet`` add their branch to the company
+    name; without a month column the date part is left out.
+    """
+    if sheet_name != default_sheet:
+        company += f" ({sheet_name.removeprefix('P&L (').removesuffix(')')})"
+    schema = columns if isinstance(columns, ColumnSchema) else resolve_columns(columns)
+    latest = schema.latest_month
+    if latest is not None:
+        return f'P&L - {company} - {latest.display}.xlsx'
+    return f'P&L - {company}.xlsx'
+
+
+def _cell_values(df):
+    """Frame values as plain Python objects, the way to_excel would write them."""
+    values = df.to_numpy(dtype=object, copy=True)
+    for idx, value in np.ndenumerate(values):
+        if value is None or (isinstance(value, float) and np.isnan(value)):
+            values[idx] = None
+        elif isinstance(value, np.generic):
+            values[idx] = value.item()
+        if isinstance(values[idx], float) and values[idx].is_integer():
+            # Excel hands whole numbers back as int; keeps widths identical
+            values[idx] = int(values[idx])
+    return values
+
+
+def _column_widths(headers, values, percent_cols):
+    """Width per column from the longest rendered value, computed per column block."""
+    frame = pd.DataFrame(values)
+    filled = frame.astype(bool) & frame.notna()
+    # The XML writer keeps 16 significant digits, so measure floats the same way
+    text = frame.map(lambda v: str(float('%.16g' % v)) if isinstance(v, float) else str(v))
+    lengths = text.apply(lambda s: s.str.len()).where(filled, 0)
+    body_max = lengths.max(axis=0).to_numpy() if len(frame) else np.zeros(len(headers), dtype=int)
+    header_len = np.array([len(str(h)) if h else 0 for h in headers])
+    widths = np.maximum(body_max, header_len) + 2
+    return np.where(percent_cols, np.minimum(widths, 10), widths)
+
+
+def _special_zone(labels):
+    """Rows strictly between NET PROFIT and 'Less: Taxes (1/3rd)' keep number formats."""
+    norm = pd.Series(labels, dtype=object)
+    norm = norm.where(norm.map(type) == str).str.strip().str.lower()
+    zone = np.zeros(len(norm), dtype=bool)
+    taxes = np.flatnonzero((norm == 'less: taxes (1/3rd)').to_numpy())
+    stop = taxes[0] if len(taxes) else len(norm)
+    net_profit = np.flatnonzero((norm.iloc[:stop] == 'net profit').to_numpy())
+    if len(taxes) and len(net_profit):
+        zone[net_profit[-1] + 1:taxes[0]] = True
+    return zone
+
+
+def _register_styles(wb, row_styles):
+    from openpyxl.styles import Alignment, Border, Font, NamedStyle, PatternFill, Side
+
+    thin = Side(border_style='thin', color='000000')
+    border = Border(top=thin, left=thin, right=thin, bottom=thin)
+    header = NamedStyle(
+        name='mis_header',
+        fill=PatternFill(start_color='003366', end_color='003366', fill_type='solid'),
+        font=Font(bold=True, color='FFFFFF', size=14),
+        alignment=Alignment(horizontal='center', vertical='center'),
+        border=border,
+    )
+    wb.add_named_style(header)
+    wb.add_named_style(NamedStyle(name='mis_body', border=border))
+    names = {None: 'mis_body'}
+    for idx, style in enumerate(sorted(set(row_styles) - {None}, key=repr)):
+        named = NamedStyle(name=f'mis_row_{idx}', border=border)
+        if style.fill:
+            named.fill = PatternFill(start_color=style.fill, end_color=style.fill, fill_type='solid')
+        if style.bold or style.underline or style.color:
+            named.font = Font(bold=style.bold, underline='single' if style.underline else None, color=style.color)
+        wb.add_named_style(named)
+        names[style] = named.name
+    return names
+
+
+def build_styled_export(df, row_styles, sheet_title='Sheet1', schema=None):
+    """Build the styled download workbook for ``df`` and return its bytes.
+
+    ``row_styles`` holds one RowStyle (or None) per row of ``df`` and
+    ``schema`` the ColumnSchema of its columns (resolved when not given). The sheet
+    is streamed through a write-only workbook: every cell references one of
+    a handful of named styles instead of carrying its own Border/Fill/Font.
+    """
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.utils import get_column_letter
+
+    schema = schema if schema is not None else resolve_columns(df.columns)
+    headers = schema.displays
+    values = _cell_values(df)
+    percent_cols = np.array([info.is_percent for info in schema], dtype=bool)
+    labels = df['PARTICULARS'] if 'PARTICULARS' in df.columns else pd.Series([None] * len(df))
+    zone = _special_zone(labels)
+
+    # Number format per cell, decided for whole blocks at once
+    numeric = np.vectorize(
+        lambda v: isinstance(v, (int, float)) and not isinstance(v, bool) and v != 0,
+        otypes=[bool],
+    )(values) if values.size else np.zeros(values.shape, dtype=bool)
+    use_percent = percent_cols[None, :] & ~zone[:, None]
+    number_formats = np.where(numeric, np.where(use_percent, PERCENT_FMT, INDIAN_NUMBER_FMT), None)
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(sheet_title)
+    style_names = _register_styles(wb, row_styles)
+    for idx, width in enumerate(_column_widths(headers, values, percent_cols), 1):
+        ws.column_dimensions[get_column_letter(idx)].width = int(width)
+
+    header_cells = []
+    for header in headers:
+        cell = WriteOnlyCell(ws, value=header)
+        cell.style = 'mis_header'
+        header_cells.append(cell)
+    ws.append(header_cells)
+
+    for r, style in enumerate(row_styles):
+        style_name = style_names[style]
+        row_cells = []
+        for c, value in enumerate(values[r]):
+            cell = WriteOnlyCell(ws, value=value)
+            cell.style = style_name
+            if number_formats[r, c] is not None:
+                cell.number_format = number_formats[r, c]
+            elif isinstance(value, datetime.datetime):
+                cell.number_format = 'mmm-yy'
+            row_cells.append(cell)
+        ws.append(row_cells)
+
+    buf = io.BytesIO()
+    wb.save(buf)
+    return buf.getvalue()
+
+
+class ExportCache(MemoryLRU):
+    """LRU of finished export files, bounded by their size in bytes."""
+
+    def __init__(self, max_bytes=32 << 20):
+        super().__init__(max_bytes, sizeof=len)
+
+
+export_cache = ExportCache()
+
+
+class BackgroundExports:
+    """Builds export files on a small thread pool so a page never waits for openpyxl.
+
+    ``submit(key, builder)`` starts ``builder()`` unless ``key`` is already
+    built or building; the finished bytes are kept in ``cache`` under
+    ``key``. Builds for different keys (branches, workbook versions) run
+    side by side, up to ``max_workers``. A failed build stays failed for
+    its key (keys change with the workbook, sheet and style rules) until
+    ``retry`` is called.
+    """
+
+    def __init__(self, cache=export_cache, max_workers=2):
+        self.cache = cache
+        self.max_workers = max_workers
+        self._pool = None
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, key, builder):
+        with self._lock:
+            if key in self.cache or key in self._jobs:
+                return
+            self._start(key, builder)
+
+    def retry(self, key, builder):
+        """Drop a failed build of ``key`` and start it again."""
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is not None and job.done() and job.exception() is not None:
+                del self._jobs[key]
+            if key in self.cache or key in self._jobs:
+                return
+            self._start(key, builder)
+
+    def _start(self, key, builder):
+        # Called with the lock held
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='mis-export')
+        self._jobs[key] = self._pool.submit(self._build, key, builder)
+
+    def _build(self, key, builder):
+        data = builder()
+        self.cache.put(key, data)
+        with self._lock:
+            self._jobs.pop(key, None)
+        return data
+
+    def status(self, key):
+        """'ready', 'building', 'failed' or None when ``key`` was never submitted."""
+        if key in self.cache:
+            return 'ready'
+        with self._lock:
+            job = self._jobs.get(key)
+        if job is None:
+            return None
+        if not job.done():
+            return 'building'
+        return 'failed' if job.exception() is not None else 'ready'
+
+    def result(self, key):
+        """The finished bytes for ``key``, or None while building (or after a failure)."""
+        return self.cache.get(key)
+
+    def error(self, key):
+        with self._lock:
+            job = self._jobs.get(key)
+        return job.exception() if job is not None and job.done() else None
+
+
+export_jobs = BackgroundExports()
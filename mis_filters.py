@@ -0,0 +1,63 @@
+import numpy as np
+
+from mis_schema import LABEL
+from mis_styles import normalize_labels
+
+# (section, start of the label that closes it), in sheet order; a section
+# runs from the row after the previous closing line through its own
+SECTIONS = (
+    ('Sales', 'net sale'),
+    ('Food cost', 'net food cost'),
+    ('Drink cost', 'net drink cost'),
+    ('Gross profit', 'gross profit'),
+    ('Expenses', 'total non operating cost'),
+    ('Net profit', 'net profit'),
+)
+BELOW_PROFIT = 'Disbursements'
+SECTION_NAMES = [name for name, _ in SECTIONS] + [BELOW_PROFIT]
+
+
+def row_sections(labels):
+    """Section name of every PARTICULARS row, as an object array aligned with ``labels``.
+
+    Closing lines are searched in order, each after the previous one, so a
+    section whose closing line is missing folds into the next. Rows after
+    NET PROFIT are ``BELOW_PROFIT``.
+    """
+    norm = normalize_labels(labels)
+    positions = np.arange(len(norm))
+    bounds = []
+    names = []
+    start = 0
+    for name, closing in SECTIONS:
+        hits = np.flatnonzero(norm.str.startswith(closing, na=False).to_numpy(dtype=bool) & (positions >= start))
+        if len(hits):
+            bounds.append(hits[0])
+            names.append(name)
+            start = hits[0] + 1
+    names.append(BELOW_PROFIT)
+    return np.array(names, dtype=object)[np.searchsorted(bounds, positions, side='left')]
+
+
+def section_rows(sections, names, row_positions):
+    """``row_positions`` kept when their section is one of ``names``."""
+    wanted = set(names)
+    return [pos for pos in row_positions if sections[pos] in wanted]
+
+
+def month_window(schema, positions, first, last):
+    """``positions`` (frame columns) narrowed to the months ``first`` .. ``last`` and their '%' columns.
+
+    Label columns stay; other columns (e.g. 'Till Feb-23', 'TOTAL') cover
+    the whole sheet rather than the window and are left out.
+    """
+    keep = set()
+    for info in schema:
+        if info.kind == LABEL:
+            keep.add(info.position)
+        elif info.is_month and first <= info.month <= last:
+            keep.add(info.position)
+            pct = schema.percent_after(info)
+            if pct is not None:
+                keep.add(pct.position)
+    return [pos for pos in positions if pos in keep]
@@ -0,0 +1,142 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+from mis_numeric import number_block, split_frame
+from mis_schema import LABEL, PERCENT, resolve_columns
+
+
+# Digits with grouping commas and a decimal point, e.g. '1,23,456.50'
+_DIGIT_TEXT = re.compile(r'^[\d,.]+$')
+
+
+def _as_float_array(values):
+    flat = pd.Series(np.asarray(values, dtype=object).ravel())
+    return pd.to_numeric(flat, errors='coerce').to_numpy(dtype=float)
+
+
+# int64 holds at most 19 digits; lakh/crore layout puts a comma after the
+# last three digits and then after every two: 1234567 -> 12,34,567
+_MAX_DIGITS = 19
+_POW10 = 10 ** np.arange(_MAX_DIGITS, dtype=np.int64)
+# Slot of digit k (0 = units) counted from the right of the formatted string
+_DIGIT_SLOTS = np.array([k if k < 3 else k + 1 + (k - 3) // 2 for k in range(_MAX_DIGITS)])
+_WIDTH = int(_DIGIT_SLOTS[-1]) + 2  # room for a leading '-'
+
+
+def _group_indian(ints, negative):
+    """Render non-negative int64 values as lakh/crore strings in one NumPy pass.
+
+    Digits are laid out right-aligned in a uint8 character matrix, shifted
+    left by each row's length and viewed as fixed-width bytes.
+    """
+    n = len(ints)
+    digits = (ints[:, None] // _POW10[None, :]) % 10
+    ndigits = np.maximum((ints[:, None] >= _POW10[None, :]).sum(axis=1), 1)
+    present = np.arange(_MAX_DIGITS)[None, :] < ndigits[:, None]
+
+    chars = np.zeros((n, _WIDTH), dtype=np.uint8)
+    cols = _WIDTH - 1 - _DIGIT_SLOTS
+    chars[:, cols] = np.where(present, digits + ord('0'), 0)
+    # A comma sits just left of digit k (k = 3, 5, 7, ...) when digit k exists
+    comma_k = np.arange(3, _MAX_DIGITS, 2)
+    chars[:, cols[comma_k] + 1] = np.where(present[:, comma_k], ord(','), 0)
+    lengths = _DIGIT_SLOTS[ndigits - 1] + 1
+    sign_col = _WIDTH - 1 - lengths
+    chars[np.arange(n), sign_col] = np.where(negative, ord('-'), 0)
+    lengths = lengths + negative
+
+    # Left-align each row so the bytes view strips the trailing padding
+    src = np.arange(_WIDTH)[None, :] + (_WIDTH - lengths)[:, None]
+    left = np.where(src < _WIDTH, np.take_along_axis(chars, np.minimum(src, _WIDTH - 1), axis=1), 0)
+    return np.ascontiguousarray(left).view(f'S{_WIDTH}').ravel().astype(f'U{_WIDTH}')
+
+
+def format_indian(values):
+    """Format an array of numbers with Indian digit grouping (12,34,567).
+
+    Values are rounded to whole numbers. Numeric strings are parsed; text,
+    blanks and NaN become ''. Returns an object array with the input's shape.
+    Each distinct value is formatted once, so repeated figures cost nothing.
+    """
+    shape = np.shape(values)
+    numbers = _as_float_array(values)
+    out = np.full(numbers.shape, '', dtype=object)
+    # Figures beyond the int64 range cannot be laid out and are left blank
+    mask = np.isfinite(numbers) & (np.abs(numbers) < 9e18)
+    if mask.any():
+        ints = np.rint(numbers[mask]).astype(np.int64)
+        uniq, inverse = np.unique(ints, return_inverse=True)
+        formatted = _group_indian(np.abs(uniq), uniq < 0).astype(object)
+        out[mask] = formatted[inverse.ravel()]
+    return out.reshape(shape)
+
+
+def format_percent(values):
+    """Format fractions as percentages with two decimals (0.0921 -> '9.21%').
+
+    Zero, blank, text and NaN become ''. Returns an object array with the
+    input's shape.
+    """
+    shape = np.shape(values)
+    numbers = _as_float_array(values)
+    out = np.full(numbers.shape, '', dtype=object)
+    mask = np.isfinite(numbers) & (numbers != 0)
+    if mask.any():
+        out[mask] = np.char.mod('%.2f%%', numbers[mask] * 100).astype(object)
+    return out.reshape(shape)
+
+
+def net_profit_position(labels):
+    """Position of the first PARTICULARS label starting with 'net profit', or None."""
+    norm = pd.Series(labels, dtype=object).str.strip().str.lower()
+    hits = np.flatnonzero(norm.str.startswith('net profit', na=False).to_numpy(dtype=bool))
+    return int(hits[0]) if len(hits) else None
+
+
+def format_pl_frame(df, schema=None, notes=None):
+    """Return a display copy of a P&L frame with every cell rendered as text.
+
+    Rows up to and including NET PROFIT are formatted per column block:
+    percent columns as percentages, label columns left as text and every
+    other column with Indian grouping. Below NET PROFIT the sheet lists
+    disbursements, so every number gets Indian grouping and notes are kept.
+    ``df`` is a typed frame (``SheetModel.numbers_at()``) with
+    ``notes`` its text cells keyed by frame position; a frame as parsed is
+    split first. ``schema`` is the ColumnSchema of ``df``, resolved here
+    when not given.
+    """
+    schema = schema if schema is not None else resolve_columns(df.columns)
+    if notes is None:
+        df, notes = split_frame(df, schema)
+    labels = df['PARTICULARS'] if 'PARTICULARS' in df.columns else pd.Series(dtype=object)
+    np_idx = net_profit_position(labels)
+    top = len(df) if np_idx is None else np_idx + 1
+
+    label_pos = schema.positions(LABEL)
+    percent_pos = schema.positions(PERCENT)
+    number_pos = [i for i in range(len(schema)) if i not in label_pos and i not in percent_pos]
+
+    values = np.full(df.shape, '', dtype=object)
+    for pos in label_pos:
+        col = df.iloc[:, pos].astype(object)
+        values[:, pos] = col.where(col.notna(), '').to_numpy()
+        # Below NET PROFIT a figure in the label column is an amount too
+        lower = col.iloc[top:]
+        figures = lower.map(lambda v: _DIGIT_TEXT.match(v) is not None if isinstance(v, str) else pd.notna(v))
+        rows = top + np.flatnonzero(figures.to_numpy(dtype=bool))
+        values[rows, pos] = format_indian(col.to_numpy()[rows])
+    if number_pos:
+        values[:, number_pos] = format_indian(number_block(df, number_pos))
+    if percent_pos:
+        block = number_block(df, percent_pos)
+        values[:top, percent_pos] = format_percent(block[:top])
+        values[top:, percent_pos] = format_indian(block[top:])
+
+    # Text cells: blank in the P&L body, shown as written below NET PROFIT
+    # unless they are figures typed as text
+    for (row, col), value in notes.items():
+        if row >= top and not (isinstance(value, str) and _DIGIT_TEXT.match(value)):
+            values[row, col] = value
+    return pd.DataFrame(values, columns=df.columns)
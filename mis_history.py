@@ -0,0 +1,270 @@
+import argparse
+import hashlib
+import os
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from mis_format import net_profit_position
+from mis_loader import find_workbooks, label_key, load_sheet_models
+from mis_numeric import PERCENT_DTYPE, number_block
+from mis_snapshot import MANIFEST_NAME, _read_manifest, _write_manifest, file_digest
+
+# Bump when the part or index layout changes so every workbook is re-ingested
+HISTORY_VERSION = 3
+INDEX_NAME = 'index.arrow'
+# One row per (branch, line, month) and source workbook
+COLUMNS = ['branch', 'line', 'occurrence', 'label', 'month', 'value', 'pct', 'source']
+KEY_COLUMNS = ['branch', 'line', 'occurrence', 'month']
+
+
+def default_history_dir(directory):
+    return os.path.join(os.path.abspath(directory), '.mis_history')
+
+
+def _sheet_lines(model):
+    """Long frame of every P&L line (through NET PROFIT) and month of one sheet.
+
+    Hidden months are included: hiding a column is a display choice, the
+    figures are still that month's.
+    """
+    labels = model.particulars[:len(model.numbers)]
+    np_idx = net_profit_position(labels)
+    top = len(labels) if np_idx is None else np_idx + 1
+    rows = [pos for pos in range(top) if labels[pos]]
+    months = model.schema.months
+    if not rows or not months:
+        return pd.DataFrame(columns=COLUMNS)
+
+    keys = [label_key(labels[pos]) for pos in rows]
+    occurrence = pd.Series(keys).groupby(keys).cumcount().to_numpy()
+    numbers = model.numbers.iloc[rows]
+    values = number_block(numbers, [info.position for info in months])
+    pct = np.full(values.shape, np.nan, dtype=PERCENT_DTYPE)
+    for idx, info in enumerate(months):
+        pct_info = model.schema.percent_after(info)
+        if pct_info is not None:
+            pct[:, idx] = numbers.iloc[:, pct_info.position].to_numpy()
+
+    n_rows, n_months = values.shape
+    frame = pd.DataFrame({
+        'branch': model.name,
+        'line': np.repeat(keys, n_months),
+        'occurrence': np.repeat(occurrence, n_months).astype('int32'),
+        'label': np.repeat([labels[pos] for pos in rows], n_months),
+        'month': np.tile(np.array([info.month for info in months], dtype='datetime64[ns]'), n_rows),
+        'value': values.ravel(),
+        'pct': pct.ravel(),
+    })
+    return frame[frame['value'].notna() | frame['pct'].notna()]
+
+
+def extract_workbook(path):
+    """Long frame of every P&L sheet in ``path``; runs in a worker process."""
+    frames = [_sheet_lines(model) for model in load_sheet_models(path).values()]
+    frame = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=COLUMNS)
+    frame['source'] = os.path.basename(path)
+    return frame[COLUMNS]
+
+
+def _write_table(frame, path):
+    table = pa.Table.from_pandas(frame, preserve_index=False)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    os.close(fd)
+    with pa.OSFile(tmp, 'wb') as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp, path)
+
+
+def _read_table(path):
+    with pa.memory_map(path, 'r') as source:
+        return pa.ipc.open_file(source).read_all().to_pandas()
+
+
+def _history_manifest(out_dir):
+    manifest = _read_manifest(out_dir)
+    if not manifest or manifest.get('version') != HISTORY_VERSION:
+        return {'version': HISTORY_VERSION, 'files': {}}
+    return manifest
+
+
+def merge_parts(parts):
+    """One row per (branch, line, month) from per-workbook frames, later workbooks winning.
+
+    ``parts`` is a list of ``(rank, frame)``; a higher rank wins where two
+    workbooks report the same month.
+    """
+    ordered = [frame for _, frame in sorted(parts, key=lambda item: item[0]) if len(frame)]
+    if not ordered:
+        return pd.DataFrame(columns=COLUMNS)
+    merged = pd.concat(ordered, ignore_index=True)
+    merged = merged.drop_duplicates(KEY_COLUMNS, keep='last')
+    return merged.sort_values(['branch', 'month'], kind='stable').reset_index(drop=True)
+
+
+def update_history(directory, out_dir=None, max_workers=None):
+    """Bring the history index for ``directory`` up to date and return a report.
+
+    Only workbooks that are new or whose contents changed since the last
+    run are parsed (in parallel); the rest are read from their stored
+    parts. Deleted workbooks drop out of the index. The manifest and index
+    are only rewritten when something changed, so a refresh of an
+    unchanged folder costs one ``os.stat`` per workbook.
+    """
+    out_dir = out_dir or default_history_dir(directory)
+    os.makedirs(out_dir, exist_ok=True)
+    manifest = _history_manifest(out_dir)
+    known = manifest['files']
+    paths = [os.path.abspath(path) for path in find_workbooks([directory])]
+
+    stale = []
+    touched = False
+    for path in paths:
+        stat = os.stat(path)
+        entry = known.get(path)
+        if entry and (entry['mtime_ns'], entry['size']) == (stat.st_mtime_ns, stat.st_size):
+            continue
+        digest = file_digest(path)
+        if entry and entry['sha256'] == digest:
+            entry.update(mtime_ns=stat.st_mtime_ns, size=stat.st_size)
+            touched = True
+            continue
+        stale.append((path, stat, digest))
+
+    if stale:
+        workers = min(max_workers or os.cpu_count() or 1, len(stale))
+        if workers < 2:
+            frames = [extract_workbook(path) for path, _, _ in stale]
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                frames = list(pool.map(extract_workbook, [path for path, _, _ in stale]))
+        for (path, stat, digest), frame in zip(stale, frames):
+            part = f'{hashlib.sha256(path.encode()).hexdigest()[:16]}.arrow'
+            _write_table(frame, os.path.join(out_dir, part))
+            latest = frame['month'].max() if len(frame) else None
+            known[path] = {
+                'mtime_ns': stat.st_mtime_ns,
+                'size': stat.st_size,
+                'sha256': digest,
+                'part': part,
+                'latest_month': None if pd.isnull(latest) else pd.Timestamp(latest).isoformat(),
+            }
+
+    removed = [path for path in known if path not in paths]
+    for path in removed:
+        _remove(os.path.join(out_dir, known.pop(path)['part']))
+
+    rebuild = stale or removed or not os.path.exists(os.path.join(out_dir, INDEX_NAME))
+    if rebuild:
+        parts = [(_rank(path, entry), _read_table(os.path.join(out_dir, entry['part'])))
+                 for path, entry in known.items()]
+        _write_table(merge_parts(parts), os.path.join(out_dir, INDEX_NAME))
+    if rebuild or touched or not os.path.exists(os.path.join(out_dir, MANIFEST_NAME)):
+        _write_manifest(out_dir, manifest)
+    return {
+        'ingested': [path for path, _, _ in stale],
+        'unchanged': len(paths) - len(stale),
+        'removed': removed,
+        'out_dir': out_dir,
+    }
+
+
+def _rank(path, entry):
+    # A workbook covering later months wins; ties go to the newer file, then the name
+    return (entry['latest_month'] or '', entry['mtime_ns'], path)
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+class HistoryIndex:
+    """Month-indexed history of every P&L line across a directory of workbooks."""
+
+    def __init__(self, frame):
+        self.frame = frame
+
+    @property
+    def branches(self):
+        return list(dict.fromkeys(self.frame['branch']))
+
+    @property
+    def lines(self):
+        """Line labels as first written, in order of first appearance."""
+        first = self.frame[self.frame['occurrence'] == 0].drop_duplicates('line')
+        return list(first['label'])
+
+    def series(self, label, branch, occurrence=0, column='value'):
+        """``column`` of one line for one branch as a Series indexed by month."""
+        rows = self.frame[
+            (self.frame['line'] == label_key(label)) & (self.frame['branch'] == branch)
+            & (self.frame['occurrence'] == occurrence)
+        ]
+        return pd.Series(rows[column].to_numpy(), index=pd.DatetimeIndex(rows['month']), name=branch).sort_index()
+
+    def table(self, label, occurrence=0, column='value'):
+        """``column`` of one line as a month x branch frame."""
+        rows = self.frame[(self.frame['line'] == label_key(label)) & (self.frame['occurrence'] == occurrence)]
+        return rows.pivot(index='month', columns='branch', values=column).sort_index()
+
+    def wide(self, branch, column='value'):
+        """One branch as a line x month frame, lines in first-seen order."""
+        rows = self.frame[self.frame['branch'] == branch]
+        order = list(dict.fromkeys(zip(rows['line'], rows['occurrence'])))
+        wide = rows.pivot(index=['line', 'occurrence'], columns='month', values=column)
+        return wide.reindex(order).sort_index(axis=1)
+
+
+_loaded = {}
+_loaded_lock = threading.Lock()
+
+
+def load_history(directory, out_dir=None, update=True, max_workers=None):
+    """HistoryIndex for ``directory``, refreshed first unless ``update`` is False.
+
+    The merged index is memoized per process and only re-read when its
+    file changes.
+    """
+    out_dir = out_dir or default_history_dir(directory)
+    if update:
+        update_history(directory, out_dir, max_workers)
+    index_path = os.path.join(out_dir, INDEX_NAME)
+    stamp = os.stat(index_path).st_mtime_ns
+    with _loaded_lock:
+        memo = _loaded.get(index_path)
+        if memo is not None and memo[0] == stamp:
+            return memo[1]
+    index = HistoryIndex(_read_table(index_path))
+    with _loaded_lock:
+        _loaded[index_path] = (stamp, index)
+    return index
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Merge a directory of MIS workbooks into one history index.')
+    parser.add_argument('directory', help='folder of monthly MIS workbooks')
+    parser.add_argument('--out', help='index folder (default: .mis_history inside the directory)')
+    parser.add_argument('--workers', type=int, help='worker processes for new workbooks (default: one per CPU)')
+    parser.add_argument('--line', help='print the history of this PARTICULARS line')
+    args = parser.parse_args(argv)
+
+    report = update_history(args.directory, args.out, args.workers)
+    print(f"{len(report['ingested'])} ingested, {report['unchanged']} unchanged, "
+          f"{len(report['removed'])} removed -> {report['out_dir']}")
+    for path in report['ingested']:
+        print(f'  + {path}')
+    if args.line:
+        index = load_history(args.directory, args.out, update=False)
+        print(index.table(args.line).to_string())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,44 @@
+import pandas as pd
+
+from mis_format import format_indian
+from mis_schema import ColumnInfo
+
+# (tile title, PARTICULARS label) in display order
+KPI_LINES = [
+    ('Total Sales and Service Charge', 'TOTAL SALES AND SERVICE CHARGES'),
+    ('Net Food Cost', 'NET FOOD COST'),
+    ('Net Drink Cost', 'NET DRINK COST'),
+    ('Gross Profit', 'GROSS PROFIT'),
+    ('Total Non Operating Cost', 'TOTAL NON OPERATING COST'),
+    ('Net Profit', 'NET PROFIT'),
+]
+
+
+def kpi_values(model, month_col, lines=KPI_LINES):
+    """Value of each KPI line in ``month_col`` from the typed block; None where the line is missing.
+
+    Lines are found through the model's label index, one dict lookup each.
+    """
+    return [model.value(row_label, month_col) for _, row_label in lines]
+
+
+def kpi_tiles(model, month=None, lines=KPI_LINES):
+    """``(month ColumnInfo, [(title, display text)])`` for the KPI tiles.
+
+    ``month`` is a month ColumnInfo or column label and defaults to the
+    latest month of the sheet; ``(None, [])`` when the sheet has no month
+    columns. Missing and zero values show as '-'.
+    """
+    if month is None:
+        month = model.schema.latest_month
+        if month is None:
+            return None, []
+    elif not isinstance(month, ColumnInfo):
+        month = model.schema.info(month)
+    values = kpi_values(model, month.name, lines)
+    tiles = []
+    for (title, _), value, text in zip(lines, values, format_indian(values)):
+        if value is None or pd.isna(value) or value == 0:
+            text = '-'
+        tiles.append((title, text))
+    return month, tiles
@@ -0,0 +1,282 @@
+import dataclasses
+import os
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from functools import cached_property
+
+import pandas as pd
+
+from mis_numeric import join_frame, split_frame
+from mis_schema import resolve_columns
+from mis_xlsx import read_comment_index, read_hidden_indexes, sheet_parts
+
+# Below this size a workbook parses faster in-process than the pool starts up
+PARALLEL_MIN_BYTES = 1 << 20
+
+
+def label_key(label):
+    """Normalized PARTICULARS label for lookups and matching: no whitespace, upper case.
+
+    Sheets differ in spacing ('DRINKS [FCD]- NON ALCO'), not in words.
+    """
+    return ''.join(str(label).split()).upper()
+
+
+@dataclass(frozen=True)
+class SheetModel:
+    """Everything the dashboard needs from one P&L sheet, read in a single pass.
+
+    Frozen: one model is shared by every session through the workbook
+    cache, so derived versions are made with ``dataclasses.replace``.
+
+    Values are held as the typed ``numbers`` block plus the ``notes`` it
+    leaves out (see ``mis_numeric.split_frame``); strings are only produced
+    by the display layer. Row and column positions are 0-based and line up
+    with ``numbers``: Excel row 2 is data row 0 and Excel column A is data
+    column 0.
+    """
+    name: str
+    numbers: pd.DataFrame
+    # {(data row, data column): value} of the text cells left out of ``numbers``
+    notes: dict = field(default_factory=dict)
+    hidden_rows: list = field(default_factory=list)
+    hidden_cols: list = field(default_factory=list)
+    # {(data row, data column): comment text}
+    comments: dict = field(default_factory=dict)
+    # Stripped PARTICULARS label for every data row ('' for blank rows)
+    particulars: list = field(default_factory=list)
+
+    @property
+    def columns(self):
+        """Column labels of the sheet, as parsed."""
+        return self.numbers.columns
+
+    @cached_property
+    def schema(self):
+        """ColumnSchema of ``columns``: every column classified once per model."""
+        return resolve_columns(self.columns)
+
+    def visible_schema(self, include_comment_cols=False):
+        """Schema of the columns ``visible_frame()`` returns, in the same order."""
+        return self.schema.select(self.visible_columns(include_comment_cols))
+
+    @cached_property
+    def label_index(self):
+        """``{label_key(label): (row positions, ...)}`` over every non-blank PARTICULARS label.
+
+        Built on first use and kept with the model; repeated labels map to
+        all their rows in sheet order.
+        """
+        index = {}
+        for pos, label in enumerate(self.particulars[:len(self.numbers)]):
+            if label:
+                index.setdefault(label_key(label), []).append(pos)
+        return {key: tuple(rows) for key, rows in index.items()}
+
+    def warm(self):
+        """Build ``schema`` and ``label_index`` now, e.g. before the model is measured for a cache."""
+        self.schema
+        self.label_index
+        return self
+
+    def row_of(self, label, occurrence=0):
+        """Row position of ``label`` (its ``occurrence``-th appearance), or None."""
+        rows = self.label_index.get(label_key(label), ())
+        return rows[occurrence] if occurrence < len(rows) else None
+
+    def value(self, label, column, default=None):
+        """Number of line ``label`` in ``column`` (NaN when blank or text); ``default`` when either is missing."""
+        row = self.row_of(label)
+        if row is None or column not in self.columns:
+            return default
+        return self.numbers.iat[row, self.columns.get_loc(column)]
+
+    @property
+    def visible_rows(self):
+        hidden = set(self.hidden_rows)
+        return [idx for idx in range(len(self.numbers)) if idx not in hidden]
+
+    @property
+    def visible_cols(self):
+        hidden = set(self.hidden_cols)
+        return [col for idx, col in enumerate(self.columns) if idx not in hidden]
+
+    @property
+    def visible_col_positions(self):
+        hidden = set(self.hidden_cols)
+        return [idx for idx in range(len(self.columns)) if idx not in hidden]
+
+    def comments_at(self, row_positions, col_positions):
+        """Comments re-keyed to positions in a sliced view of the sheet.
+
+        ``row_positions``/``col_positions`` list the sheet rows/columns the
+        view shows, in order. Returns ``{(view row, view column): text}``.
+        """
+        return _cells_at(self.comments, row_positions, col_positions)
+
+    def notes_at(self, row_positions, col_positions):
+        """``notes`` re-keyed to positions in a sliced view, like ``comments_at``."""
+        return _cells_at(self.notes, row_positions, col_positions)
+
+    @property
+    def comment_cols(self):
+        positions = sorted({col for _, col in self.comments})
+        return [self.columns[idx] for idx in positions if idx < len(self.columns)]
+
+    def visible_columns(self, include_comment_cols=False):
+        """Unhidden column names in sheet order.
+
+        With ``include_comment_cols`` hidden columns that carry a comment are
+        kept as well.
+        """
+        cols = self.visible_cols
+        if include_comment_cols:
+            wanted = set(cols) | set(self.comment_cols)
+            cols = [col for col in self.columns if col in wanted]
+        return cols
+
+    def visible_frame(self, include_comment_cols=False):
+        """Return the unhidden rows/columns of the sheet as a fresh frame of cell values.
+
+        Numbers and notes are joined back (``mis_numeric.join_frame``), so
+        the frame holds what the sheet shows, e.g. for the Excel export.
+        """
+        rows = self.visible_rows
+        positions = [self.columns.get_loc(col) for col in self.visible_columns(include_comment_cols)]
+        return join_frame(self.numbers_at(rows, positions), self.notes_at(rows, positions))
+
+    def numbers_at(self, row_positions, col_positions):
+        """The typed block of the given sheet rows and columns, renumbered from 0."""
+        return self.numbers.iloc[list(row_positions), list(col_positions)].reset_index(drop=True)
+
+
+def _cells_at(cells, row_positions, col_positions):
+    rows = {pos: idx for idx, pos in enumerate(row_positions)}
+    cols = {pos: idx for idx, pos in enumerate(col_positions)}
+    return {(rows[r], cols[c]): value for (r, c), value in cells.items() if r in rows and c in cols}
+
+
+def _data_comments(comment_index, n_rows, n_cols):
+    # Sheet coordinates -> data positions; the header row and column A are skipped
+    return {
+        (row - 1, col): text.strip() for (row, col), text in comment_index.items()
+        if 1 <= row <= n_rows and 1 <= col < n_cols and text.strip()
+    }
+
+
+def read_sheet_model(xls, zf, sheet_name):
+    """Build a SheetModel for ``sheet_name``.
+
+    ``xls`` is an open ``pd.ExcelFile`` (read-only openpyxl underneath) and
+    ``zf`` the same workbook as a ``ZipFile``. Cell values come from pandas
+    and are split into numbers and notes straight away, so the parsed frame
+    is not kept; hidden rows/columns and comments are streamed from the
+    sheet's XML parts, so no full in-memory workbook is built.
+    """
+    data = xls.parse(sheet_name)
+    numbers, notes = split_frame(data)
+
+    sheet_rows, sheet_cols = read_hidden_indexes(zf, sheet_name)
+    # Sheet row 1 is the header, so data row = sheet row - 1
+    hidden_rows = [idx - 1 for idx in sheet_rows if 1 <= idx <= len(data)]
+    hidden_cols = [idx for idx in sheet_cols if idx < len(data.columns)]
+    comments = _data_comments(read_comment_index(zf, sheet_name), len(data), len(data.columns))
+
+    if 'PARTICULARS' in data.columns:
+        particulars = [str(v).strip() if pd.notnull(v) else '' for v in data['PARTICULARS']]
+    else:
+        particulars = [''] * len(data)
+
+    return SheetModel(
+        name=sheet_name,
+        numbers=numbers,
+        notes=notes,
+        hidden_rows=hidden_rows,
+        hidden_cols=hidden_cols,
+        comments=comments,
+        particulars=particulars,
+    )
+
+
+def is_pl_sheet(sheet_name):
+    """True for the per-branch profit & loss sheets, e.g. 'P&L (Niko)'."""
+    return sheet_name.startswith('P&L (') and sheet_name.endswith(')')
+
+
+def find_workbooks(inputs):
+    """XLSX files named in ``inputs``; directories are searched one level deep.
+
+    Excel lock files (``~$...``) are skipped.
+    """
+    found = []
+    for item in inputs:
+        if os.path.isdir(item):
+            names = sorted(os.listdir(item))
+            found.extend(os.path.join(item, name) for name in names
+                         if name.lower().endswith('.xlsx') and not name.startswith('~$'))
+        else:
+            found.append(item)
+    return found
+
+
+def load_sheet_models(path, sheet_names=None):
+    """Open the workbook once and return ``{sheet name: SheetModel}``.
+
+    Without ``sheet_names`` every P&L sheet in the workbook is read.
+    """
+    with pd.ExcelFile(path, engine='openpyxl') as xls, zipfile.ZipFile(path) as zf:
+        if sheet_names is None:
+            sheet_names = [name for name in xls.sheet_names if is_pl_sheet(name)]
+        return {name: read_sheet_model(xls, zf, name) for name in sheet_names}
+
+
+def load_sheet_model(path, sheet_name):
+    """Open the workbook once and return the SheetModel for one sheet."""
+    return load_sheet_models(path, [sheet_name])[sheet_name]
+
+
+def pl_sheet_names(path):
+    """Names of the P&L sheets in workbook order, read from workbook.xml only."""
+    return [name for name in sheet_parts(path) if is_pl_sheet(name)]
+
+
+def load_sheet_models_parallel(path, sheet_names=None, max_workers=None):
+    """Like ``load_sheet_models`` but parses each sheet in its own process.
+
+    Every worker opens the workbook read-only and parses just its sheet, so
+    branches load side by side. Small workbooks, or a single sheet, are read
+    in-process because starting the pool would cost more than it saves.
+    """
+    if sheet_names is None:
+        sheet_names = pl_sheet_names(path)
+    workers = min(max_workers or os.cpu_count() or 1, len(sheet_names))
+    if workers < 2 or os.path.getsize(path) < PARALLEL_MIN_BYTES:
+        return load_sheet_models(path, sheet_names)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        models = pool.map(load_sheet_model, [path] * len(sheet_names), sheet_names)
+        return dict(zip(sheet_names, models))
+
+
+def reload_sheet_models(path, previous, changes):
+    """Bring ``previous`` (``{sheet name: SheetModel}``) up to date with the file at ``path``.
+
+    ``changes`` maps sheet names to 'data' or 'comments', as returned by
+    ``mis_xlsx.changed_sheets``. 'data' sheets are reparsed, 'comments'
+    sheets keep their values and only re-read the comments part, and every
+    other model is reused as is. The result follows the workbook's current
+    P&L sheet order.
+    """
+    names = pl_sheet_names(path)
+    reparse = [name for name in names if changes.get(name) == 'data' or name not in previous]
+    models = load_sheet_models_parallel(path, reparse) if reparse else {}
+    with zipfile.ZipFile(path) as zf:
+        for name in names:
+            if name in models:
+                continue
+            model = previous[name]
+            if changes.get(name) == 'comments':
+                comments = _data_comments(read_comment_index(zf, name), len(model.numbers), len(model.columns))
+                model = dataclasses.replace(model, comments=comments)
+            models[name] = model
+    return {name: models[name] for name in names}
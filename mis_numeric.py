@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+
+from mis_schema import LABEL, resolve_columns
+
+# Amounts stay float64: float32 stops holding whole rupees past 2**24 (1.67 crore).
+# Sheet '%' columns are stored as amounts too, since below NET PROFIT they
+# hold rupee figures
+AMOUNT_DTYPE = np.float64
+# Derived shares (period comparisons, history), shown to two decimals of a
+# percent and well inside float32
+PERCENT_DTYPE = np.float32
+
+
+def split_frame(df, schema=None):
+    """``(numbers, notes)`` for a sheet frame as parsed.
+
+    ``numbers`` has the frame's shape and columns: label columns as
+    categoricals and every other column (percent columns included) as
+    float64, with NaN for blank and text cells. ``notes`` maps
+    ``(row, column position)`` to the original value of each non-blank
+    cell outside the label columns that is not a number (disbursement
+    notes below NET PROFIT). ``schema`` is the ColumnSchema of ``df``.
+    """
+    schema = schema if schema is not None else resolve_columns(df.columns)
+    columns = {}
+    notes = {}
+    for pos, info in enumerate(schema):
+        col = df.iloc[:, pos]
+        if info.kind == LABEL:
+            columns[pos] = pd.Categorical(col)
+            continue
+        if col.dtype == object:
+            numbers = pd.to_numeric(col, errors='coerce')
+            for row in np.flatnonzero((col.notna() & numbers.isna()).to_numpy()):
+                notes[(int(row), pos)] = col.iat[row]
+            col = numbers
+        columns[pos] = col.to_numpy(dtype=AMOUNT_DTYPE, na_value=np.nan)
+    numbers = pd.DataFrame(columns, index=pd.RangeIndex(len(df)))
+    numbers.columns = df.columns
+    return numbers, notes
+
+
+def join_frame(numbers, notes):
+    """The sheet frame as parsed, rebuilt from ``split_frame``'s ``(numbers, notes)``.
+
+    Every column comes back as object values with NaN for blanks and the
+    ``notes`` put back in their cells.
+    """
+    columns = {}
+    for pos in range(numbers.shape[1]):
+        columns[pos] = numbers.iloc[:, pos].to_numpy(dtype=object)
+    for (row, pos), value in notes.items():
+        columns[pos][row] = value
+    frame = pd.DataFrame(columns, index=pd.RangeIndex(len(numbers)))
+    frame.columns = numbers.columns
+    return frame
+
+
+def number_block(numbers, positions):
+    """float64 ``(rows, len(positions))`` array of the numeric columns at ``positions``."""
+    if not len(positions):
+        return np.empty((len(numbers), 0))
+    return numbers.iloc[:, list(positions)].to_numpy(dtype=np.float64)
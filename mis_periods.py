@@ -0,0 +1,167 @@
+import numpy as np
+import pandas as pd
+
+from mis_format import net_profit_position
+from mis_numeric import AMOUNT_DTYPE, PERCENT_DTYPE, number_block
+from mis_schema import OTHER, PERCENT, ColumnInfo, ColumnSchema
+
+# The financial year runs April to March
+FY_START_MONTH = 4
+BASE_LINE = 'NET SALE'
+TRAILING_MONTHS = 3
+
+# (key, column / series header, shown as a percentage)
+METRICS = [
+    ('mom', 'MoM Δ', False),
+    ('mom_pct', 'MoM %', True),
+    ('yoy', 'YoY Δ', False),
+    ('yoy_pct', 'YoY %', True),
+    ('ytd', 'YTD', False),
+    ('trailing', f'{TRAILING_MONTHS}M avg', False),
+    ('of_base', f'% of {BASE_LINE}', True),
+]
+METRIC_HEADERS = {key: header for key, header, _ in METRICS}
+_PERCENT_METRICS = {key for key, _, is_percent in METRICS if is_percent}
+
+
+def _shift(block, n, fill=np.nan):
+    """``block`` moved ``n`` columns to the right, the first ``n`` columns set to ``fill``."""
+    out = np.full(block.shape, fill, dtype=block.dtype)
+    if n < block.shape[1]:
+        out[:, n:] = block[:, :block.shape[1] - n]
+    return out
+
+
+def _change(current, previous):
+    delta = current - previous
+    with np.errstate(invalid='ignore', divide='ignore'):
+        ratio = np.where(previous != 0, delta / np.abs(previous), np.nan)
+    return delta, ratio
+
+
+class PeriodTable:
+    """Period comparisons for every line (through NET PROFIT) and month of one sheet.
+
+    ``metrics[key]`` is a float64 ``(rows, months)`` array: row ``r`` is data
+    row ``r`` and column ``i`` is ``months[i]`` (oldest first).
+    """
+
+    def __init__(self, months, n_rows, metrics, values):
+        self.months = months
+        self.n_rows = n_rows
+        self.metrics = metrics
+        self.values = values
+        self.column_index = {info.name: idx for idx, info in enumerate(months)}
+
+    def series(self, row, key=None):
+        """Month-indexed series of data row ``row``: its values, or metric ``key``."""
+        block = self.values if key is None else self.metrics[key]
+        return pd.Series(
+            block[row] if row < self.n_rows else np.nan,
+            index=pd.DatetimeIndex([info.month for info in self.months]),
+            name=METRIC_HEADERS.get(key, 'Value'),
+        )
+
+
+def period_table(model, window=TRAILING_MONTHS, base_label=BASE_LINE):
+    """Compute every period metric of ``model`` in one pass over its numeric block.
+
+    Months are laid out on a dense calendar axis first, so 'previous month'
+    and 'same month last year' mean the calendar neighbours; a gap in the
+    sheet gives NaN, not a comparison with an older month. YTD sums the
+    reported months of the financial year so far; the trailing average is
+    the mean of the reported months in the last ``window``. '% of NET SALE'
+    divides each line by ``base_label`` in the same month.
+    """
+    labels = model.particulars[:len(model.numbers)]
+    np_idx = net_profit_position(labels)
+    top = len(labels) if np_idx is None else np_idx + 1
+    months = model.schema.months
+    values = number_block(model.numbers.iloc[:top], [info.position for info in months])
+    if not months:
+        return PeriodTable(months, top, {key: values for key, _, _ in METRICS}, values)
+
+    ordinal = np.array([info.month.year * 12 + info.month.month - 1 for info in months])
+    start = ordinal.min()
+    slots = ordinal - start
+    span = int(slots.max()) + 1
+    dense = np.full((top, span), np.nan)
+    dense[:, slots] = values
+    present = ~np.isnan(dense)
+
+    mom, mom_pct = _change(dense, _shift(dense, 1))
+    yoy, yoy_pct = _change(dense, _shift(dense, 12))
+
+    calendar = start + np.arange(span)
+    fiscal_year = calendar // 12 - (calendar % 12 + 1 < FY_START_MONTH)
+    total = np.cumsum(np.where(present, dense, 0.0), axis=1)
+    fy_start = np.maximum.accumulate(np.where(np.r_[True, fiscal_year[1:] != fiscal_year[:-1]], np.arange(span), 0))
+    before = np.where(fy_start > 0, total[:, np.maximum(fy_start - 1, 0)], 0.0)
+    ytd = np.where(present, total - before, np.nan)
+
+    counts = np.cumsum(present, axis=1)
+    window_sum = total - _shift(total, window, 0.0)
+    window_count = counts - _shift(counts, window, 0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        trailing = np.where(present & (window_count > 0), window_sum / window_count, np.nan)
+
+    base_row = model.row_of(base_label)
+    if base_row is not None and base_row < top:
+        base = dense[base_row]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            of_base = np.where(base != 0, dense / base, np.nan)
+    else:
+        of_base = np.full(dense.shape, np.nan)
+
+    dense_metrics = {
+        'mom': mom, 'mom_pct': mom_pct, 'yoy': yoy, 'yoy_pct': yoy_pct,
+        'ytd': ytd, 'trailing': trailing, 'of_base': of_base,
+    }
+    return PeriodTable(months, top, {key: block[:, slots] for key, block in dense_metrics.items()}, values)
+
+
+def add_period_columns(df, schema, table, keys, row_positions, *cell_maps):
+    """Insert the ``keys`` metric columns after each month block of a view.
+
+    ``df`` is a typed view (``SheetModel.numbers_at()``) with ``schema``
+    its ColumnSchema, showing the data rows ``row_positions``. A month's
+    metrics follow its '%' column, or the month itself when it has none.
+    ``cell_maps`` (notes, comments: ``{(view row, view column): value}``)
+    are re-keyed to the new column positions. Returns
+    ``(frame, schema, *cell_maps)``.
+    """
+    if not keys:
+        return (df, schema) + cell_maps
+    rows = np.asarray(row_positions, dtype=int)
+    in_body = rows < table.n_rows
+    arrays = []
+    infos = []
+    moved = {}
+    for pos, info in enumerate(schema):
+        moved[pos] = len(infos)
+        arrays.append(df.iloc[:, pos])
+        infos.append(info)
+        if info.is_month and schema.percent_after(info) is None:
+            month = info
+        elif info.is_percent and pos > 0 and schema[pos - 1].is_month:
+            month = schema[pos - 1]
+        else:
+            continue
+        idx = table.column_index.get(month.name)
+        if idx is None:
+            continue
+        for key in keys:
+            column = np.full(len(rows), np.nan)
+            column[in_body] = table.metrics[key][rows[in_body], idx]
+            is_percent = key in _PERCENT_METRICS
+            arrays.append(column.astype(PERCENT_DTYPE if is_percent else AMOUNT_DTYPE))
+            header = METRIC_HEADERS[key]
+            infos.append(ColumnInfo(f'{header} {month.display}', 0, PERCENT if is_percent else OTHER, None, header))
+
+    frame = pd.DataFrame(dict(enumerate(arrays)))
+    frame.columns = [info.name for info in infos]
+    new_schema = ColumnSchema(
+        ColumnInfo(info.name, idx, info.kind, info.month, info.display) for idx, info in enumerate(infos)
+    )
+    remapped = tuple({(r, moved[c]): value for (r, c), value in cells.items()} for cells in cell_maps)
+    return (frame, new_schema) + remapped
@@ -0,0 +1,119 @@
+import contextlib
+import datetime
+import json
+import os
+import threading
+import time
+import tracemalloc
+
+# MIS_PROFILE=1 records wall time and peak memory per stage, MIS_PROFILE=time
+# records wall time only. Unset (the default) makes every stage a no-op.
+PROFILE_ENV = 'MIS_PROFILE'
+LOG_ENV = 'MIS_PROFILE_LOG'
+DEFAULT_LOG = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'mis_profile.jsonl')
+
+_NULL_STAGE = contextlib.nullcontext()
+_log_lock = threading.Lock()
+
+# Profilers recording memory share one tracemalloc session: the first one
+# starts it (unless something else already traces) and the last to close
+# stops it, so a run finishing never cuts off another still in progress
+_tracing_lock = threading.Lock()
+_tracing_users = 0
+_started_tracing = False
+
+
+def _acquire_tracing():
+    global _tracing_users, _started_tracing
+    with _tracing_lock:
+        if _tracing_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _started_tracing = True
+        _tracing_users += 1
+
+
+def _release_tracing():
+    global _tracing_users, _started_tracing
+    with _tracing_lock:
+        _tracing_users -= 1
+        if _tracing_users == 0 and _started_tracing:
+            tracemalloc.stop()
+            _started_tracing = False
+
+
+class StageProfiler:
+    """Collects ``(stage, seconds, peak bytes)`` records for one dashboard run.
+
+    tracemalloc is process-wide, so with several sessions rendering at once
+    the memory figures include their allocations too; timings are per run.
+    """
+
+    def __init__(self, enabled=False, memory=True, log_path=None):
+        self.enabled = enabled
+        self.memory = enabled and memory
+        self.log_path = log_path or DEFAULT_LOG
+        self.records = []
+        self._pending = 0
+        self._started = time.perf_counter()
+        self._tracing = self.memory
+        if self._tracing:
+            _acquire_tracing()
+
+    @classmethod
+    def from_env(cls):
+        mode = os.environ.get(PROFILE_ENV, '').strip().lower()
+        if mode in ('', '0', 'false', 'no', 'off'):
+            return cls(enabled=False)
+        return cls(enabled=True, memory=mode != 'time', log_path=os.environ.get(LOG_ENV))
+
+    def stage(self, name):
+        """Context manager timing one stage; a shared no-op when profiling is off."""
+        return self._stage(name) if self.enabled else _NULL_STAGE
+
+    @contextlib.contextmanager
+    def _stage(self, name):
+        # Tracing may have been stopped by whoever started it outside this module
+        memory = self.memory and tracemalloc.is_tracing()
+        base = 0
+        if memory:
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1] - base if memory else None
+            self.records.append({'stage': name, 'seconds': seconds, 'peak_bytes': peak})
+
+    def summary(self):
+        """Rows for the sidebar panel: stage, milliseconds and peak KiB."""
+        return [
+            {
+                'stage': rec['stage'],
+                'ms': round(rec['seconds'] * 1000, 1),
+                'peak KiB': None if rec['peak_bytes'] is None else round(rec['peak_bytes'] / 1024, 1),
+            }
+            for rec in self.records
+        ]
+
+    def flush(self, **context):
+        """Append the records gathered since the last flush as one JSON line."""
+        if not self.enabled or self._pending == len(self.records):
+            return
+        line = {
+            'time': datetime.datetime.now().isoformat(timespec='milliseconds'),
+            'pid': os.getpid(),
+            'run_seconds': time.perf_counter() - self._started,
+            **context,
+            'stages': self.records[self._pending:],
+        }
+        self._pending = len(self.records)
+        with _log_lock, open(self.log_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(line, default=str) + '\n')
+
+    def close(self):
+        """Release tracemalloc; it stops once no other profiler is using it."""
+        if self._tracing:
+            self._tracing = False
+            _release_tracing()
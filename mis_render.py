@@ -0,0 +1,192 @@
+import html
+import json
+import os
+import sys
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+from pandas.io.formats.style import Styler
+
+from mis_cache import MemoryLRU
+from mis_schema import resolve_columns
+
+_MISSING = object()
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'templates')
+
+# Styler whose HTML template writes Excel comments straight onto the <td> tags
+CommentStyler = Styler.from_custom_template(TEMPLATE_DIR, html_table='mis_table.tpl')
+
+
+def cell_comment_ids(comments):
+    """Turn ``{(row, col): text}`` display positions into Styler cell ids.
+
+    Text is attribute-escaped here; newlines become ``&#10;`` so a blank line
+    in a comment cannot end the HTML block inside ``st.markdown``.
+    """
+    return {
+        f'row{row}_col{col}': html.escape(text, quote=True).replace('\n', '&#10;')
+        for (row, col), text in comments.items()
+    }
+
+
+def highlight_sales_block(df, display_comments, row_styles):
+    """Per-cell CSS for ``Styler.apply``: row colours plus the comment-cell highlight."""
+    # Row colours come from the shared rule table in mis_styles
+    css = np.array([style.css if style else '' for style in row_styles], dtype=object)
+    highlights = np.repeat(css[:, None], len(df.columns), axis=1)
+
+    # Apply automatic highlighting for cells with Excel comments (overrides default styling)
+    for row_idx, col_idx in display_comments:
+        # Highlight cells with Excel comments (light blue with red border)
+        highlights[row_idx, col_idx] = 'background-color: #ADD8E6 !important; border: 2px solid #FF6347 !important; font-weight: bold !important; position: relative'
+
+    return pd.DataFrame(highlights, index=df.index, columns=df.columns)
+
+
+def style_table(df, row_styles, display_comments, schema=None):
+    """Styler for the formatted P&L table: header look, column widths, row colours.
+
+    ``schema`` is the ColumnSchema of ``df`` (resolved when not given); its
+    display strings become the header text, so repeated headers such as
+    '%' stay unique in the frame.
+    """
+    schema = schema if schema is not None else resolve_columns(df.columns)
+
+    # Build table styles
+    table_styles = [
+        {
+            'selector': 'th',
+            'props': [
+                ('background-color', '#003366'),
+                ('color', 'white'),
+                ('font-weight', 'bold'),
+                ('font-size', '16px'),
+                ('text-align', 'center')
+            ]
+        },
+        {
+            'selector': 'td',
+            'props': [
+                ('text-align', 'center')
+            ]
+        }
+    ]
+
+    # Add specific width for month columns
+    for idx, info in enumerate(schema):
+        if info.is_month:
+            table_styles.append({
+                'selector': f'th:nth-child({idx+1}), td:nth-child({idx+1})',
+                'props': [
+                    ('min-width', '120px'),
+                    ('max-width', '120px'),
+                    ('width', '120px'),
+                    ('text-align', 'center')
+                ]
+            })
+        elif info.name == 'PARTICULARS':
+            table_styles.append({
+                'selector': f'th:nth-child({idx+1}), td:nth-child({idx+1})',
+                'props': [
+                    ('text-align', 'left'),
+                    ('min-width', '250px')
+                ]
+            })
+        elif info.is_percent:
+            table_styles.append({
+                'selector': f'th:nth-child({idx+1}), td:nth-child({idx+1})',
+                'props': [
+                    ('min-width', '80px'),
+                    ('max-width', '80px'),
+                    ('width', '80px'),
+                    ('text-align', 'center')
+                ]
+            })
+
+    # Cell CSS is computed here rather than lazily inside to_html()
+    highlights = highlight_sales_block(df, display_comments, row_styles)
+    styler = CommentStyler(df).set_table_styles(table_styles).hide(axis='index')
+    styler = styler.relabel_index(schema.displays, axis=1)
+    return styler.apply(lambda _: highlights, axis=None)
+
+
+GRID_ROW_HEIGHT = 30
+GRID_HEADER_HEIGHT = 42
+GRID_MAX_HEIGHT = 600
+
+
+def _grid_column_width(info, values):
+    # Same widths as the HTML table: months 120px, percentages 80px
+    if info.name == 'PARTICULARS':
+        longest = max((len(str(v)) for v in values), default=0)
+        return max(250, 8 * longest + 24)
+    if info.is_percent:
+        return 80
+    return 120
+
+
+@lru_cache(maxsize=1)
+def _grid_template():
+    with open(os.path.join(TEMPLATE_DIR, 'mis_grid.html'), encoding='utf-8') as f:
+        return f.read()
+
+
+def grid_document(df, row_styles, comments, schema=None):
+    """Windowed table for ``components.html``; returns ``(html, height)``.
+
+    ``df`` is the formatted display frame, ``row_styles`` one RowStyle (or
+    None) per row and ``comments`` the ``{(row, col): text}`` map of the
+    displayed grid. The page gets the cells as JSON and only puts the rows
+    and columns in view into the DOM, keeping the sticky header, row colours
+    and comment tooltips of the full HTML table. ``schema`` supplies the
+    header text and column kinds as in ``style_table``.
+    """
+    schema = schema if schema is not None else resolve_columns(df.columns)
+    style_index = {}
+    row_style = [style_index.setdefault(style.css if style else '', len(style_index)) for style in row_styles]
+    payload = {
+        'columns': [html.escape(display) for display in schema.displays],
+        'widths': [_grid_column_width(info, df.iloc[:, idx]) for idx, info in enumerate(schema)],
+        'align': ['left' if info.name == 'PARTICULARS' else 'center' for info in schema],
+        'rows': [[html.escape(str(value)) for value in row] for row in df.itertuples(index=False)],
+        'styles': list(style_index),
+        'row_style': row_style,
+        'comments': {f'{r},{c}': html.escape(text, quote=True) for (r, c), text in comments.items()},
+        'row_height': GRID_ROW_HEIGHT,
+        'header_height': GRID_HEADER_HEIGHT,
+    }
+    # '</' inside the JSON would close the <script> block early
+    data = json.dumps(payload, ensure_ascii=False).replace('</', '<\\/')
+    height = min(GRID_MAX_HEIGHT, GRID_HEADER_HEIGHT + GRID_ROW_HEIGHT * len(df)) + 18
+    return _grid_template().replace('__GRID_DATA__', data), height
+
+
+def _fragment_size(value):
+    # Strings dominate a rendered fragment; other parts (heights, flags) are noise
+    parts = value if isinstance(value, tuple) else (value,)
+    return sum(sys.getsizeof(part) for part in parts if isinstance(part, str))
+
+
+class FragmentCache(MemoryLRU):
+    """LRU of rendered HTML fragments, bounded by the memory their strings take.
+
+    Keys are built by the caller from everything the HTML depends on: the
+    workbook's content hash, the sheet and column range shown, the render
+    mode and ``mis_styles.RULES_VERSION``. A rerun that changes none of
+    these (a download click, another widget) reuses the finished HTML.
+    """
+
+    def __init__(self, max_bytes=64 << 20):
+        super().__init__(max_bytes, sizeof=_fragment_size)
+
+    def get_or_build(self, key, builder):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = builder()
+            self.put(key, value)
+        return value
+
+
+fragment_cache = FragmentCache()
@@ -0,0 +1,138 @@
+import datetime
+import re
+from dataclasses import dataclass
+
+import pandas as pd
+
+MONTH = 'month'
+PERCENT = 'percent'
+LABEL = 'label'
+OTHER = 'other'
+
+MONTH_FMT = '%b-%y'
+LABEL_COLUMNS = ('particulars', 'branch')
+# Text headers accepted as months; real month columns arrive as datetimes
+_MONTH_TEXT_FORMATS = ('%b-%y', '%b-%Y', '%B-%y', '%B-%Y', '%Y-%m-%d', '%Y-%m-%d %H:%M:%S', '%Y-%m')
+# pandas renames repeated headers 'X', 'X.1', 'X.2', ...
+_DUPLICATE_SUFFIX = re.compile(r'^(.*)\.(\d+)$')
+_UNNAMED = re.compile(r'^Unnamed: \d+$')
+
+
+def is_percent_label(col):
+    col = str(col).strip()
+    return col.startswith('%') or col.endswith('%')
+
+
+def parse_month(col):
+    """First day of the month a header stands for, or None."""
+    if isinstance(col, datetime.datetime):
+        return pd.Timestamp(col).normalize().replace(day=1)
+    if isinstance(col, str):
+        text = col.strip()
+        for fmt in _MONTH_TEXT_FORMATS:
+            try:
+                return pd.Timestamp(datetime.datetime.strptime(text, fmt)).replace(day=1)
+            except ValueError:
+                continue
+    return None
+
+
+@dataclass(frozen=True)
+class ColumnInfo:
+    """How one sheet column is treated by every stage."""
+    name: object            # the column label in the frame
+    position: int           # position in the frame the schema was resolved for
+    kind: str               # MONTH, PERCENT, LABEL or OTHER
+    month: pd.Timestamp = None
+    display: str = ''       # header text in the table and the export
+
+    @property
+    def is_month(self):
+        return self.kind == MONTH
+
+    @property
+    def is_percent(self):
+        return self.kind == PERCENT
+
+
+def classify_column(col, position=0, earlier=()):
+    """ColumnInfo for ``col``; ``earlier`` holds the headers before it, for duplicate names."""
+    month = parse_month(col)
+    if month is not None:
+        return ColumnInfo(col, position, MONTH, month, month.strftime(MONTH_FMT))
+
+    display = '' if col is None else str(col)
+    match = _DUPLICATE_SUFFIX.match(display)
+    if match and match.group(1) in earlier:
+        display = match.group(1)
+    if _UNNAMED.match(display):
+        display = ''
+    if display.strip().lower() in LABEL_COLUMNS:
+        kind = LABEL
+    elif is_percent_label(display):
+        kind = PERCENT
+    else:
+        kind = OTHER
+    return ColumnInfo(col, position, kind, None, display)
+
+
+class ColumnSchema:
+    """Classified columns of one frame, in frame order."""
+
+    def __init__(self, infos):
+        self.infos = tuple(infos)
+        self._by_name = {info.name: info for info in self.infos}
+
+    def __iter__(self):
+        return iter(self.infos)
+
+    def __len__(self):
+        return len(self.infos)
+
+    def __getitem__(self, position):
+        return self.infos[position]
+
+    def info(self, name):
+        return self._by_name.get(name)
+
+    @property
+    def displays(self):
+        return [info.display for info in self.infos]
+
+    def positions(self, kind):
+        """Frame positions (within this schema) of the columns of ``kind``."""
+        return [idx for idx, info in enumerate(self.infos) if info.kind == kind]
+
+    @property
+    def months(self):
+        """Month columns, oldest first (sheet order breaks ties)."""
+        return sorted((info for info in self.infos if info.is_month), key=lambda info: info.month)
+
+    @property
+    def latest_month(self):
+        months = self.months
+        return months[-1] if months else None
+
+    def percent_after(self, info):
+        """The percent column right after ``info`` in the sheet, or None."""
+        nxt = info.position + 1
+        if nxt < len(self.infos) and self.infos[nxt].is_percent:
+            return self.infos[nxt]
+        return None
+
+    def select(self, names):
+        """Schema of a column subset (e.g. the visible columns), renumbered for that subset."""
+        return ColumnSchema(
+            ColumnInfo(info.name, idx, info.kind, info.month, info.display)
+            for idx, info in enumerate(self._by_name[name] for name in names)
+        )
+
+
+def resolve_columns(columns):
+    """Classify every column of a frame once; see ColumnSchema."""
+    infos = []
+    seen = set()
+    for position, col in enumerate(columns):
+        infos.append(classify_column(col, position, seen))
+        seen.add(str(col))
+    return ColumnSchema(infos)
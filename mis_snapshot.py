@@ -0,0 +1,310 @@
+import argparse
+import datetime
+import hashlib
+import json
+import os
+import re
+import tempfile
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from mis_loader import SheetModel, load_sheet_models_parallel
+from mis_schema import LABEL, resolve_columns
+
+# Bump when the on-disk layout changes so old snapshots are re-ingested
+SNAPSHOT_VERSION = 3
+MANIFEST_NAME = 'manifest.json'
+
+
+def file_digest(path, chunk_size=1 << 20):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def default_snapshot_dir(path, root=None):
+    """``<root>/<workbook stem>``; ``root`` defaults to ``.mis_snapshots`` next to the workbook."""
+    path = os.path.abspath(path)
+    stem = os.path.splitext(os.path.basename(path))[0]
+    root = root or os.path.join(os.path.dirname(path), '.mis_snapshots')
+    return os.path.join(root, stem)
+
+
+def _safe_name(sheet_name):
+    return re.sub(r'[^A-Za-z0-9_-]+', '_', sheet_name).strip('_') or 'sheet'
+
+
+def _encode_label(value):
+    # Column headers are a mix of strings and month datetimes
+    if isinstance(value, (datetime.datetime, pd.Timestamp)):
+        return {'type': 'datetime', 'value': value.isoformat()}
+    if isinstance(value, bool):
+        return {'type': 'str', 'value': str(value)}
+    if isinstance(value, (int, np.integer)):
+        return {'type': 'int', 'value': int(value)}
+    if isinstance(value, (float, np.floating)):
+        return {'type': 'float', 'value': float(value)}
+    return {'type': 'str', 'value': str(value)}
+
+
+def _decode_label(label):
+    if label['type'] == 'datetime':
+        return datetime.datetime.fromisoformat(label['value'])
+    if label['type'] == 'int':
+        return int(label['value'])
+    if label['type'] == 'float':
+        return float(label['value'])
+    return label['value']
+
+
+def _is_number(value):
+    return isinstance(value, (int, float, np.integer, np.floating)) and not isinstance(value, bool)
+
+
+def _encode_column(series, field):
+    """Split one label column into typed Arrow arrays.
+
+    Numeric columns are stored as-is. Object columns become a float64
+    array for the numbers (figures below NET PROFIT) plus a string array
+    for the text cells.
+    """
+    if series.dtype != object:
+        return 'typed', {field: pa.array(series.to_numpy(), from_pandas=True)}
+    values = series.to_numpy()
+    numbers = np.full(len(values), np.nan)
+    texts = [None] * len(values)
+    has_numbers = False
+    for idx, value in enumerate(values):
+        if value is None or (isinstance(value, float) and np.isnan(value)):
+            continue
+        if _is_number(value):
+            numbers[idx] = value
+            has_numbers = True
+        elif isinstance(value, (datetime.datetime, pd.Timestamp)):
+            texts[idx] = value.isoformat()
+        else:
+            texts[idx] = str(value)
+    if not has_numbers:
+        return 'text', {field + '_text': pa.array(texts, type=pa.string())}
+    return 'mixed', {
+        field: pa.array(numbers, type=pa.float64(), from_pandas=True),
+        field + '_text': pa.array(texts, type=pa.string()),
+    }
+
+
+def _decode_column(kind, table, field):
+    if kind == 'typed':
+        return table.column(field).to_pandas()
+    texts = table.column(field + '_text').to_pylist()
+    values = np.array([np.nan if text is None else text for text in texts], dtype=object)
+    if kind == 'mixed':
+        numbers = table.column(field).to_numpy(zero_copy_only=False)
+        for idx in np.flatnonzero(~np.isnan(numbers)):
+            number = numbers[idx]
+            # openpyxl/pandas hand whole numbers back as int
+            values[idx] = int(number) if float(number).is_integer() else float(number)
+    return pd.Series(values, dtype=object)
+
+
+def write_sheet_snapshot(model, out_dir):
+    """Write ``model`` as an Arrow IPC file plus a JSON metadata sidecar.
+
+    Number columns are stored as float64 Arrow arrays, label columns are
+    split like mixed cells and ``notes`` go in the sidecar.
+    """
+    base = _safe_name(model.name)
+    arrays = {}
+    kinds = []
+    for idx, info in enumerate(model.schema):
+        col = model.numbers.iloc[:, idx]
+        if info.kind == LABEL:
+            kind, encoded = _encode_column(col.astype(object), f'c{idx}')
+        else:
+            kind, encoded = 'typed', {f'c{idx}': pa.array(col.to_numpy(), from_pandas=True)}
+        kinds.append(kind)
+        arrays.update(encoded)
+    table = pa.table(arrays) if arrays else pa.table({})
+
+    # Both files are written then renamed, like the manifest, so a reader or
+    # a crash never meets a half-written one. Uncompressed IPC file so
+    # readers can memory-map it
+    fd, tmp = tempfile.mkstemp(dir=out_dir, suffix='.tmp')
+    os.close(fd)
+    with pa.OSFile(tmp, 'wb') as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp, os.path.join(out_dir, base + '.arrow'))
+
+    meta = {
+        'name': model.name,
+        'rows': len(model.numbers),
+        'columns': [_encode_label(col) for col in model.columns],
+        'kinds': kinds,
+        'hidden_rows': list(model.hidden_rows),
+        'hidden_cols': list(model.hidden_cols),
+        'particulars': list(model.particulars),
+        'comments': [[r, c, text] for (r, c), text in sorted(model.comments.items())],
+        'notes': [[r, c, _encode_label(value)] for (r, c), value in sorted(model.notes.items())],
+    }
+    fd, tmp = tempfile.mkstemp(dir=out_dir, suffix='.tmp')
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False)
+    os.replace(tmp, os.path.join(out_dir, base + '.meta.json'))
+    return base
+
+
+def read_sheet_snapshot(out_dir, base):
+    """Load one sheet snapshot back into a SheetModel through a memory map."""
+    with open(os.path.join(out_dir, base + '.meta.json'), encoding='utf-8') as f:
+        meta = json.load(f)
+    with pa.memory_map(os.path.join(out_dir, base + '.arrow'), 'r') as source:
+        table = pa.ipc.open_file(source).read_all()
+    labels = [_decode_label(label) for label in meta['columns']]
+    columns = {}
+    for info, kind in zip(resolve_columns(labels), meta['kinds']):
+        col = _decode_column(kind, table, f'c{info.position}')
+        columns[info.position] = pd.Categorical(col) if info.kind == LABEL else col
+    numbers = pd.DataFrame(columns, index=pd.RangeIndex(meta['rows']))
+    numbers.columns = labels
+    return SheetModel(
+        name=meta['name'],
+        numbers=numbers,
+        notes={(r, c): _decode_label(value) for r, c, value in meta['notes']},
+        hidden_rows=meta['hidden_rows'],
+        hidden_cols=meta['hidden_cols'],
+        comments={(r, c): text for r, c, text in meta['comments']},
+        particulars=meta['particulars'],
+    )
+
+
+def _read_manifest(out_dir):
+    try:
+        with open(os.path.join(out_dir, MANIFEST_NAME), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_manifest(out_dir, manifest):
+    # Write-then-rename so a concurrent reader never sees half a manifest
+    fd, tmp = tempfile.mkstemp(dir=out_dir, suffix='.tmp')
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1)
+    os.replace(tmp, os.path.join(out_dir, MANIFEST_NAME))
+
+
+def snapshot_is_fresh(path, out_dir=None, digest=None):
+    """True when the snapshot in ``out_dir`` was ingested from the current file.
+
+    With ``digest`` (the caller's sha256 of the file) the snapshot must have
+    been written for exactly those bytes. Without it, unchanged mtime and
+    size are trusted and the hash is only computed when either changed.
+    """
+    out_dir = out_dir or default_snapshot_dir(path)
+    manifest = _read_manifest(out_dir)
+    if not manifest or manifest.get('version') != SNAPSHOT_VERSION:
+        return False
+    stat = os.stat(path)
+    source = manifest['source']
+    same_stat = (source['mtime_ns'], source['size']) == (stat.st_mtime_ns, stat.st_size)
+    if digest is None and same_stat:
+        return True
+    if (digest or file_digest(path)) != source['sha256']:
+        return False
+    if same_stat:
+        return True
+    # Same bytes, new mtime (file copied or touched): remember the new stat
+    source.update(mtime_ns=stat.st_mtime_ns, size=stat.st_size)
+    _write_manifest(out_dir, manifest)
+    return True
+
+
+def ingest_workbook(path, out_dir=None, digest=None):
+    """Parse every P&L sheet of ``path`` (in parallel) and write its snapshot."""
+    models = load_sheet_models_parallel(path)
+    return update_snapshot(path, models, out_dir=out_dir, digest=digest)
+
+
+def update_snapshot(path, models, changed=None, out_dir=None, digest=None, base_digest=None):
+    """Record ``models`` as the snapshot of the current ``path``.
+
+    Only the sheets named in ``changed`` are rewritten (all of them when
+    None); the others keep their files from the previous manifest, provided
+    that manifest was written for ``base_digest``, the file version the
+    unchanged models were read from. Files of sheets no longer in the
+    manifest (renamed or removed) are deleted.
+    """
+    out_dir = out_dir or default_snapshot_dir(path)
+    os.makedirs(out_dir, exist_ok=True)
+    stat = os.stat(path)
+    digest = digest or file_digest(path)
+    manifest = _read_manifest(out_dir) or {}
+    previous = {}
+    if manifest.get('version') == SNAPSHOT_VERSION and manifest['source'].get('sha256') == base_digest:
+        previous = manifest.get('sheets', {})
+    sheets = {}
+    for name, model in models.items():
+        if changed is None or name in changed or name not in previous:
+            sheets[name] = write_sheet_snapshot(model, out_dir)
+        else:
+            sheets[name] = previous[name]
+    _write_manifest(out_dir, {
+        'version': SNAPSHOT_VERSION,
+        'source': {
+            'path': os.path.abspath(path),
+            'mtime_ns': stat.st_mtime_ns,
+            'size': stat.st_size,
+            'sha256': digest,
+        },
+        'sheets': sheets,
+    })
+    _prune_snapshot(out_dir, set(sheets.values()))
+    return models
+
+
+def _prune_snapshot(out_dir, bases):
+    for name in os.listdir(out_dir):
+        for suffix in ('.arrow', '.meta.json'):
+            if name.endswith(suffix) and name[:-len(suffix)] not in bases:
+                try:
+                    os.remove(os.path.join(out_dir, name))
+                except OSError:
+                    pass
+
+
+def load_snapshot_models(path, out_dir=None, digest=None, refresh=False):
+    """Return ``{sheet name: SheetModel}`` for every P&L sheet, re-ingesting only if needed.
+
+    ``refresh`` skips the snapshot and always re-reads the XLSX.
+    """
+    out_dir = out_dir or default_snapshot_dir(path)
+    if not refresh and snapshot_is_fresh(path, out_dir, digest):
+        manifest = _read_manifest(out_dir)
+        try:
+            return {name: read_sheet_snapshot(out_dir, base) for name, base in manifest['sheets'].items()}
+        except (OSError, ValueError, KeyError, pa.ArrowException):
+            pass  # Damaged snapshot, rebuild it below
+    return ingest_workbook(path, out_dir, digest)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Ingest MIS workbooks into Arrow snapshots.')
+    parser.add_argument('workbooks', nargs='+', help='XLSX files to ingest')
+    parser.add_argument('--root', help='snapshot root directory (default: .mis_snapshots next to each workbook)')
+    parser.add_argument('--force', action='store_true', help='re-ingest even if the snapshot is fresh')
+    args = parser.parse_args(argv)
+    for path in args.workbooks:
+        out_dir = default_snapshot_dir(path, args.root)
+        if not args.force and snapshot_is_fresh(path, out_dir):
+            print(f'{path}: snapshot up to date')
+            continue
+        models = ingest_workbook(path, out_dir)
+        print(f'{path}: ingested {len(models)} sheets into {out_dir}')
+
+
+if __name__ == '__main__':
+    main()
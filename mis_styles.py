@@ -0,0 +1,136 @@
+import hashlib
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+
+@dataclass(frozen=True)
+class RowStyle:
+    """Look of one P&L row, shared by the HTML table and the Excel export."""
+    fill: str = None        # hex RGB without '#'
+    color: str = None       # font colour, hex RGB without '#'
+    bold: bool = False
+    underline: bool = False
+
+    @property
+    def css(self):
+        parts = []
+        if self.fill:
+            parts.append(f'background-color: #{self.fill}')
+        if self.color:
+            parts.append(f'color: #{self.color}')
+        if self.bold:
+            parts.append('font-weight: bold')
+        if self.underline:
+            parts.append('text-decoration: underline')
+        return '; '.join(parts)
+
+
+@dataclass(frozen=True)
+class BlockRule:
+    """Colour every labelled row from a start label through an end label (inclusive).
+
+    ``start_contains`` matches start labels as substrings, so 'SALES',
+    'FOOD SALES' and 'SALES - DELIVERY' all open the sales block.
+    """
+    start: tuple
+    end: tuple
+    style: RowStyle
+    end_style: RowStyle = None
+    start_contains: bool = False
+
+
+SALES = RowStyle(fill='fff9c4')
+TOTAL_SALES = RowStyle(fill='ffe066', bold=True)
+PINK = RowStyle(fill='ffe6f0')
+PINK_BOLD = RowStyle(fill='ffe6f0', bold=True)
+LIGHT_BLUE = RowStyle(fill='d6f0ff')
+LIGHT_GREEN = RowStyle(fill='e6ffe6')
+LIGHT_RED = RowStyle(fill='ffe6e6')
+HEADING = RowStyle(bold=True, underline=True)
+BLUE_TOTAL = RowStyle(fill='4f81bd', color='FFFFFF', bold=True)
+GREEN_TOTAL = RowStyle(fill='5cb85c', color='FFFFFF', bold=True)
+
+# Blocks are applied in order; later blocks win where they overlap
+BLOCK_RULES = (
+    BlockRule(start=('sales',), end=('total sales and service charges',),
+              style=SALES, end_style=TOTAL_SALES, start_contains=True),
+    BlockRule(start=('grocery local [fcl]', 'grocery [fcl]'), end=('drinks [fcd]',), style=LIGHT_BLUE),
+    BlockRule(start=('drinks [fcd] - alco',), end=('drinks [fcd] - non alco',), style=LIGHT_GREEN),
+    BlockRule(start=('add: opening inventory (alco)',),
+              end=('less: closing inventory (non-alco)', 'add: closing inventory (non-alco)'),
+              style=LIGHT_GREEN),
+    BlockRule(start=('bank charges/credit card charges',), end=('license fees',), style=LIGHT_RED),
+)
+
+# Exact (stripped, lower-case) labels; these override any block colour
+LABEL_STYLES = {
+    'less: discount': PINK,
+    'less: adjusted ( net of gst)': PINK,
+    'net discount': PINK_BOLD,
+    'net sale': RowStyle(fill='e75480', bold=True),
+    'cost of food sold': HEADING,
+    'total food cost': BLUE_TOTAL,
+    'add: opening inventory (food)': LIGHT_BLUE,
+    'less: closing inventory (food)': LIGHT_BLUE,
+    'add: opening inventory': LIGHT_BLUE,
+    'less: closing inventory': LIGHT_BLUE,
+    'net food cost': BLUE_TOTAL,
+    'cost of drinks sold': HEADING,
+    'total drinks cost': GREEN_TOTAL,
+    'net drink cost': GREEN_TOTAL,
+    'gross profit': RowStyle(fill='d9534f', color='FFFFFF', bold=True),
+    'expenses': HEADING,
+    'total non operating cost': RowStyle(fill='ff9900', bold=True),
+    'net profit': RowStyle(fill='b30000', color='FFFFFF', bold=True),
+    'less: taxes (1/3rd)': RowStyle(fill='fffacd', bold=True),
+    'disbursement': BLUE_TOTAL,
+}
+
+# Changes whenever a rule or colour above is edited; part of rendered-HTML cache keys
+RULES_VERSION = hashlib.sha256(
+    repr((BLOCK_RULES, sorted(LABEL_STYLES.items()))).encode()
+).hexdigest()[:12]
+
+
+def normalize_labels(labels):
+    """Stripped lower-case labels; non-text cells become None."""
+    series = pd.Series(labels, dtype=object)
+    return series.where(series.map(type) == str).str.strip().str.lower()
+
+
+def _block_mask(norm, is_label, rule):
+    positions = np.arange(len(norm))
+    if rule.start_contains:
+        pattern = '|'.join(rule.start)
+        starts = norm.str.contains(pattern, regex=True, na=False).to_numpy(dtype=bool)
+    else:
+        starts = norm.isin(rule.start).to_numpy()
+    ends = norm.isin(rule.end).to_numpy()
+    # A row is inside the block when the latest start at or before it comes
+    # after the latest end strictly before it
+    last_start = np.maximum.accumulate(np.where(starts, positions, -1))
+    last_end = np.maximum.accumulate(np.where(ends, positions, -1))
+    end_before = np.concatenate(([-1], last_end[:-1]))
+    return is_label & (last_start >= 0) & (last_start > end_before), ends
+
+
+def compile_row_styles(labels):
+    """Map every PARTICULARS label to its RowStyle (or None) in one pass.
+
+    Returns an object array aligned with ``labels``.
+    """
+    norm = normalize_labels(labels)
+    is_label = norm.notna().to_numpy()
+    styles = np.full(len(norm), None, dtype=object)
+    for rule in BLOCK_RULES:
+        inside, ends = _block_mask(norm, is_label, rule)
+        styles[inside] = rule.style
+        if rule.end_style is not None:
+            styles[inside & ends] = rule.end_style
+    exact = norm.map(LABEL_STYLES).to_numpy(dtype=object)
+    has_exact = pd.notna(exact)
+    styles[has_exact] = exact[has_exact]
+    return styles
+
@@ -0,0 +1,124 @@
+import argparse
+import datetime
+
+import numpy as np
+from openpyxl import Workbook
+from openpyxl.comments import Comment
+
+# Lines of a branch P&L in sheet order; None is a spacer row. Extra expense
+# lines are inserted before LICENSE FEES to reach the requested row count.
+_HEAD_LINES = [
+    'FOOD SALES', 'DRINKS SALES', 'SERVICE CHARGE', 'TOTAL SALES AND SERVICE CHARGES', None,
+    'LESS: DISCOUNT', None, 'NET SALE', None,
+    'COST OF FOOD SOLD', 'GROCERY LOCAL [FCL]', 'GROCERY IMPORTED [FCI]', 'DAIRY PRODUCTS [FCA]',
+    'MEAT & SEAFOOD [FCM]', 'VEGETABLES [FCV]', 'DRINKS [FCD]', None,
+    'ADD: OPENING INVENTORY (FOOD)', 'LESS: CLOSING INVENTORY (FOOD)', 'NET FOOD COST', None,
+    'COST OF DRINKS SOLD', 'DRINKS [FCD] - ALCO', 'DRINKS [FCD] - NON ALCO', None,
+    'ADD: OPENING INVENTORY (ALCO)', 'ADD: OPENING INVENTORY (NON-ALCO)',
+    'LESS: CLOSING INVENTORY (ALCO)', 'LESS: CLOSING INVENTORY (NON-ALCO)', 'NET DRINK COST', None,
+    'GROSS PROFIT', None,
+    'EXPENSES', 'BANK CHARGES/CREDIT CARD CHARGES', 'STAFF SALARIES [SS]', 'RENT', 'ELECTRICITY',
+]
+_TAIL_LINES = [
+    'LICENSE FEES', 'TOTAL NON OPERATING COST', None, 'NET PROFIT', None,
+    'Less: Taxes (1/3rd)', None, 'DISBURSEMENT',
+]
+_HEADINGS = {'COST OF FOOD SOLD', 'COST OF DRINKS SOLD', 'EXPENSES'}
+_NOTES = ['Paid', 'Pending', 'Adjusted next month', 'Partner drawings']
+_MIN_ROWS = len(_HEAD_LINES) + len(_TAIL_LINES)
+
+
+def pl_labels(rows):
+    """PARTICULARS labels for a synthetic sheet with ``rows`` data rows.
+
+    The standard P&L lines are always present, so short requests get
+    ``_MIN_ROWS`` rows.
+    """
+    extra = max(0, rows - _MIN_ROWS)
+    return _HEAD_LINES + [f'OTHER EXPENSE {idx + 1:03d}' for idx in range(extra)] + _TAIL_LINES
+
+
+def month_starts(months, last=datetime.datetime(2025, 9, 1)):
+    """``months`` consecutive month starts ending at ``last``."""
+    out = []
+    year, month = last.year, last.month
+    for _ in range(months):
+        out.append(datetime.datetime(year, month, 1))
+        year, month = (year, month - 1) if month > 1 else (year - 1, 12)
+    return out[::-1]
+
+
+def write_pl_sheet(ws, rows=70, months=12, hidden_rows=0.05, hidden_cols=0.5,
+                   comment_density=0.01, rng=None):
+    """Fill ``ws`` with a P&L-shaped sheet.
+
+    ``hidden_rows`` is the share of data rows hidden, ``hidden_cols`` the
+    share of month blocks (oldest first) hidden and ``comment_density`` the
+    share of month cells carrying a comment.
+    """
+    rng = rng if rng is not None else np.random.default_rng(0)
+    labels = pl_labels(rows)
+    dates = month_starts(months)
+    ws.append(['PARTICULARS'] + [value for date in dates for value in (date, '%')])
+
+    amounts = rng.uniform(1e4, 5e6, size=(len(labels), months)).round(2)
+    net_sale = amounts[labels.index('NET SALE')]
+    below = labels.index('NET PROFIT') + 1
+    for r, label in enumerate(labels):
+        row = [label]
+        for m in range(months):
+            if label is None or label in _HEADINGS:
+                row += [None, None]
+            elif r >= below:
+                # Disbursement notes mix text and figures below NET PROFIT
+                note = _NOTES[rng.integers(len(_NOTES))] if rng.random() < 0.3 else float(amounts[r, m])
+                row += [note, None]
+            else:
+                row += [float(amounts[r, m]), float(amounts[r, m] / net_sale[m])]
+        ws.append(row)
+
+    n_hidden_cols = int(round(months * hidden_cols))
+    for m in range(n_hidden_cols):
+        for col in (2 + 2 * m, 3 + 2 * m):
+            ws.column_dimensions[ws.cell(row=1, column=col).column_letter].hidden = True
+    n_hidden_rows = int(round(len(labels) * hidden_rows))
+    for r in rng.choice(len(labels), size=n_hidden_rows, replace=False):
+        ws.row_dimensions[int(r) + 2].hidden = True
+
+    n_comments = int(round(len(labels) * months * comment_density))
+    for flat in rng.choice(len(labels) * months, size=n_comments, replace=False):
+        r, m = divmod(int(flat), months)
+        ws.cell(row=r + 2, column=2 + 2 * m).comment = Comment(f'ADMIN:\nNote {flat}', 'ADMIN')
+
+
+def generate_workbook(path, branches=('Niko',), seed=0, **sheet_options):
+    """Write a synthetic MIS workbook with one ``P&L (<branch>)`` sheet per branch."""
+    rng = np.random.default_rng(seed)
+    wb = Workbook()
+    wb.remove(wb.active)
+    for branch in branches:
+        write_pl_sheet(wb.create_sheet(f'P&L ({branch})'), rng=rng, **sheet_options)
+    wb.save(path)
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Write a synthetic P&L workbook.')
+    parser.add_argument('path', help='output .xlsx path')
+    parser.add_argument('--rows', type=int, default=70)
+    parser.add_argument('--months', type=int, default=12)
+    parser.add_argument('--hidden-rows', type=float, default=0.05, help='share of rows hidden')
+    parser.add_argument('--hidden-cols', type=float, default=0.5, help='share of month blocks hidden')
+    parser.add_argument('--comment-density', type=float, default=0.01, help='share of month cells with a comment')
+    parser.add_argument('--branches', nargs='+', default=['Niko'])
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+    generate_workbook(
+        args.path, branches=args.branches, seed=args.seed, rows=args.rows, months=args.months,
+        hidden_rows=args.hidden_rows, hidden_cols=args.hidden_cols, comment_density=args.comment_density,
+    )
+    print(f'wrote {args.path}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+import os
+import threading
+import time
+import zipfile
+
+from mis_cache import workbook_cache
+
+
+class WorkbookWatcher:
+    """Background poller that reloads a workbook as soon as it is replaced.
+
+    Every ``interval`` seconds the file's mtime and size are compared with
+    the last load. On a change the shared cache rebuilds the sheet models,
+    reparsing only the sheets whose zip members changed, and ``version``
+    goes up so sessions know to rerun. A file caught half-written (not yet
+    a valid zip) is retried on the next tick.
+    """
+
+    def __init__(self, path, cache=workbook_cache, interval=2.0):
+        self.path = os.path.abspath(path)
+        self.cache = cache
+        self.interval = interval
+        self.version = 0
+        # (time.time(), {sheet name: 'data' | 'comments'}) of the last reload
+        self.last_change = None
+        self.error = None
+        self._stat = self._read_stat()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _read_stat(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def check(self):
+        """Reload if the file changed since the last check; True when a new version was loaded."""
+        stat = self._read_stat()
+        if stat is None or stat == self._stat:
+            return False
+        try:
+            self.cache.get_sheet_models(self.path)
+        except (OSError, zipfile.BadZipFile, KeyError) as exc:
+            # Still being written, or briefly missing during a replace
+            self.error = exc
+            return False
+        self._stat = stat
+        self.error = None
+        self.last_change = (time.time(), dict(self.cache.last_changes.get(self.path, {})))
+        self.version += 1
+        return True
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.check()
+            except Exception as exc:  # keep watching; the next save may parse
+                self.error = exc
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name=f'mis-watch {os.path.basename(self.path)}', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+_watchers = {}
+_watchers_lock = threading.Lock()
+
+
+def watch(path, cache=workbook_cache, interval=2.0):
+    """The running watcher for ``path``, started on first use; one per process."""
+    path = os.path.abspath(path)
+    with _watchers_lock:
+        watcher = _watchers.get(path)
+        if watcher is None:
+            watcher = _watchers[path] = WorkbookWatcher(path, cache, interval)
+        return watcher.start()
@@ -0,0 +1,239 @@
+import posixpath
+import re
+import zipfile
+from xml.etree import ElementTree as ET
+
+# Reads individual parts of an XLSX package straight from the zip container,
+# without building openpyxl cell objects.
+
+MAIN_NS = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+REL_NS = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}'
+PKG_REL_NS = '{http://schemas.openxmlformats.org/package/2006/relationships}'
+COMMENTS_REL = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships/comments'
+
+_REF_RE = re.compile(r'^\$?([A-Za-z]{1,3})\$?(\d+)$')
+
+
+def cell_position(ref):
+    """0-based ``(row, column)`` for an A1 reference: 'AF43' -> (42, 31)."""
+    match = _REF_RE.match(ref)
+    if match is None:
+        raise ValueError(f'not a cell reference: {ref!r}')
+    letters, row = match.groups()
+    col = 0
+    for ch in letters.upper():
+        col = col * 26 + ord(ch) - 64
+    return int(row) - 1, col - 1
+
+
+def _open_zip(source):
+    return source if isinstance(source, zipfile.ZipFile) else zipfile.ZipFile(source)
+
+
+def _rels_path(part):
+    folder, name = posixpath.split(part)
+    return posixpath.join(folder, '_rels', name + '.rels')
+
+
+def _resolve(part, target):
+    if target.startswith('/'):
+        return target.lstrip('/')
+    return posixpath.normpath(posixpath.join(posixpath.dirname(part), target))
+
+
+def _relationships(zf, part):
+    """``{relationship id: (type, target part)}`` for one package part."""
+    try:
+        stream = zf.open(_rels_path(part))
+    except KeyError:
+        return {}
+    rels = {}
+    with stream:
+        for _, elem in ET.iterparse(stream):
+            if elem.tag == PKG_REL_NS + 'Relationship' and elem.get('TargetMode') != 'External':
+                rels[elem.get('Id')] = (elem.get('Type'), _resolve(part, elem.get('Target')))
+    return rels
+
+
+def sheet_parts(source):
+    """``{sheet name: worksheet part}`` in workbook order, e.g. 'xl/worksheets/sheet1.xml'."""
+    zf = _open_zip(source)
+    try:
+        rels = _relationships(zf, 'xl/workbook.xml')
+        parts = {}
+        with zf.open('xl/workbook.xml') as stream:
+            for _, elem in ET.iterparse(stream):
+                if elem.tag == MAIN_NS + 'sheet':
+                    rel = rels.get(elem.get(REL_NS + 'id'))
+                    if rel is not None:
+                        parts[elem.get('name')] = rel[1]
+                elif elem.tag == MAIN_NS + 'sheets':
+                    break
+        return parts
+    finally:
+        if zf is not source:
+            zf.close()
+
+
+def _sheet_part(zf, sheet_name):
+    parts = sheet_parts(zf)
+    if sheet_name not in parts:
+        raise KeyError(f'worksheet {sheet_name!r} not found')
+    return parts[sheet_name]
+
+
+def _comments_part(zf, sheet_part):
+    for rel_type, target in _relationships(zf, sheet_part).values():
+        if rel_type == COMMENTS_REL:
+            return target
+    return None
+
+
+def _iter_comments(stream):
+    # Only <t> runs of the comment body count; phonetic hints (<rPh>) are skipped
+    text_tag = MAIN_NS + 't'
+    phonetic_tag = MAIN_NS + 'rPh'
+    ref = None
+    chunks = []
+    in_phonetic = 0
+    for event, elem in ET.iterparse(stream, events=('start', 'end')):
+        tag = elem.tag
+        if event == 'start':
+            if tag == MAIN_NS + 'comment':
+                ref, chunks = elem.get('ref'), []
+            elif tag == phonetic_tag:
+                in_phonetic += 1
+            continue
+        if tag == text_tag and ref is not None and not in_phonetic:
+            chunks.append(elem.text or '')
+        elif tag == phonetic_tag:
+            in_phonetic -= 1
+        elif tag == MAIN_NS + 'comment':
+            yield ref, ''.join(chunks)
+            ref = None
+            elem.clear()
+
+
+def read_comment_index(source, sheet_name):
+    """Return ``{(row, column): text}`` for every cell comment on ``sheet_name``.
+
+    ``source`` is a path or an open ``ZipFile``. Only the sheet's comments
+    part is parsed, incrementally, so the cost follows the number of
+    comments rather than the size of the grid. Positions are 0-based sheet
+    coordinates (Excel cell A1 is ``(0, 0)``).
+    """
+    zf = _open_zip(source)
+    try:
+        comments_part = _comments_part(zf, _sheet_part(zf, sheet_name))
+        if comments_part is None:
+            return {}
+        with zf.open(comments_part) as stream:
+            return {cell_position(ref): text for ref, text in _iter_comments(stream)}
+    finally:
+        if zf is not source:
+            zf.close()
+
+
+def _is_true(value):
+    return value in ('1', 'true')
+
+
+def _iter_hidden(stream):
+    """Yield ('col', index) and ('row', index) for hidden columns and rows.
+
+    Everything after <sheetData> is skipped, and each <row> is dropped once
+    its attributes are read, so memory stays flat however many rows the
+    sheet has.
+    """
+    col_tag, row_tag, data_tag = MAIN_NS + 'col', MAIN_NS + 'row', MAIN_NS + 'sheetData'
+    sheet_data = None
+    row = 0
+    for event, elem in ET.iterparse(stream, events=('start', 'end')):
+        tag = elem.tag
+        if event == 'start':
+            if tag == data_tag:
+                sheet_data = elem
+            elif tag == row_tag:
+                # 'r' may be omitted, in which case the row follows the previous one
+                row = int(elem.get('r') or row + 1)
+                if _is_true(elem.get('hidden')):
+                    yield 'row', row - 1
+            elif tag == col_tag and _is_true(elem.get('hidden')):
+                start = int(elem.get('min'))
+                for col in range(start - 1, int(elem.get('max') or start)):
+                    yield 'col', col
+        elif tag == row_tag:
+            sheet_data.clear()
+        elif tag == data_tag:
+            break
+
+
+def read_hidden_indexes(source, sheet_name):
+    """Return ``(hidden_rows, hidden_cols)`` for ``sheet_name`` as sorted lists.
+
+    Only the <cols> block and the <row> attributes of the worksheet XML
+    are read, incrementally; cell values are never materialised. Positions
+    are 0-based sheet coordinates, like ``read_comment_index``.
+    """
+    zf = _open_zip(source)
+    try:
+        hidden = {'row': set(), 'col': set()}
+        with zf.open(_sheet_part(zf, sheet_name)) as stream:
+            for kind, idx in _iter_hidden(stream):
+                hidden[kind].add(idx)
+        return sorted(hidden['row']), sorted(hidden['col'])
+    finally:
+        if zf is not source:
+            zf.close()
+
+
+# Parts every sheet's values depend on; a change to any of them reloads all sheets
+SHARED_PARTS = ('xl/workbook.xml', 'xl/_rels/workbook.xml.rels', 'xl/sharedStrings.xml', 'xl/styles.xml')
+
+
+def member_crcs(source):
+    """``{member name: CRC-32}`` from the zip central directory; nothing is decompressed."""
+    zf = _open_zip(source)
+    try:
+        return {info.filename: info.CRC for info in zf.infolist()}
+    finally:
+        if zf is not source:
+            zf.close()
+
+
+def sheet_dependencies(source, sheet_names=None):
+    """``{sheet name: (data parts, comments part or None)}`` for each sheet.
+
+    The data parts are the worksheet XML and its relationships; the comments
+    part is listed separately because it can change on its own.
+    """
+    zf = _open_zip(source)
+    try:
+        parts = sheet_parts(zf)
+        deps = {}
+        for name in sheet_names if sheet_names is not None else parts:
+            part = parts[name]
+            deps[name] = ((part, _rels_path(part)), _comments_part(zf, part))
+        return deps
+    finally:
+        if zf is not source:
+            zf.close()
+
+
+def changed_sheets(old_crcs, new_crcs, deps):
+    """``{sheet name: 'data' | 'comments'}`` for the sheets whose parts differ.
+
+    ``deps`` comes from ``sheet_dependencies`` on the new file. A sheet whose
+    worksheet XML (or relationships) changed needs a full reparse, one
+    where only the comments part changed just needs its comments re-read.
+    Changes to the shared parts mark every sheet as 'data'.
+    """
+    if any(old_crcs.get(part) != new_crcs.get(part) for part in SHARED_PARTS):
+        return {name: 'data' for name in deps}
+    changes = {}
+    for name, (data_parts, comments_part) in deps.items():
+        if any(old_crcs.get(part) != new_crcs.get(part) for part in data_parts):
+            changes[name] = 'data'
+        elif comments_part is not None and old_crcs.get(comments_part) != new_crcs.get(comments_part):
+            changes[name] = 'comments'
+    return changes
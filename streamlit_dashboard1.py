@@ -1,13 +1,20 @@
 import streamlit as st
-import pandas as pd
 import os
-import plotly.express as px
-import numpy as np
-import openpyxl
-import json
-from pathlib import Path
-from bs4 import BeautifulSoup
-from openpyxl.utils import get_column_letter
+import pandas as pd
+from datetime import datetime
+from mis_cache import workbook_cache
+from mis_charts import trend_figures
+from mis_consolidate import CONSOLIDATED_NAME, consolidate_models
+from mis_export import DEFAULT_SHEET, build_styled_export, export_cache, export_file_name, export_jobs
+from mis_filters import SECTION_NAMES, month_window, row_sections, section_rows
+from mis_format import format_pl_frame
+from mis_history import load_history
+from mis_kpi import kpi_tiles
+from mis_periods import METRIC_HEADERS, METRICS, add_period_columns, period_table
+from mis_profile import StageProfiler
+from mis_render import cell_comment_ids, fragment_cache, grid_document, style_table
+from mis_styles import RULES_VERSION, compile_row_styles
+from mis_watch import watch
 
 st.set_page_config(page_title="Niko Foods Profitability Dashboard", layout="wide")
 
@@ -55,894 +62,422 @@ st.markdown(
     unsafe_allow_html=True
 )
 
-# Load only the Niko sheet from Excel
-file_path = os.path.join(os.path.dirname(__file__), "Bomba Foods-MIS.xlsx")
-if not os.path.exists(file_path):
-    st.error(f"Excel file '{file_path}' not found in this directory.")
-    st.stop()
-
-# Only load the Niko sheet
-sheets_data = {'P&L (Niko)': pd.read_excel(file_path, sheet_name='P&L (Niko)')}
-
-# Convert 'Month' column to string for all dataframes if it is datetime
-def ensure_month_str(df):
-    if 'Month' in df.columns and pd.api.types.is_datetime64_any_dtype(df['Month']):
-        df['Month'] = df['Month'].dt.strftime('%Y-%m')
-    return df
-
-branch_frames = []
-sheets_data_str = {}
-for branch, df in sheets_data.items():
-    df = ensure_month_str(df.copy())
-    df['Branch'] = branch
-    branch_frames.append(df)
-    sheets_data_str[branch] = df
-
-full_df = pd.concat(branch_frames, ignore_index=True)
-full_df = ensure_month_str(full_df)
-
-# Only show Niko branch
-branch_names = ['P&L (Niko)']
-branch_option = 'P&L (Niko)'
-
-# Determine unhidden columns for the selected branch using openpyxl
-import openpyxl
-excel_path = file_path
-wb = openpyxl.load_workbook(excel_path, read_only=False, data_only=True)
-ws = wb[branch_option]
-
-# Get indexes of unhidden columns (1-based for openpyxl)
-unhidden_col_indexes = [
-    idx for idx, col in enumerate(ws.iter_cols(1, ws.max_column), 1)
-    if not ws.column_dimensions[openpyxl.utils.get_column_letter(idx)].hidden
-]
-
-# Get indexes of unhidden rows (1-based for openpyxl, skip header row)
-unhidden_row_indexes = [
-    idx - 1 for idx in range(2, ws.max_row + 1)  # -1 to convert to 0-based pandas index (row 2 in Excel = index 1 in pandas)
-    if not ws.row_dimensions[idx].hidden
-]
-
-# Map to DataFrame column names (0-based for pandas)
-df_cols = list(sheets_data_str[branch_option].columns)
-unhidden_cols = [df_cols[idx-1] for idx in unhidden_col_indexes if idx-1 < len(df_cols)]
-
-# Also include columns that have comments, even if they're hidden
-comment_columns = set()
-try:
-    temp_wb = openpyxl.load_workbook(excel_path, read_only=False, data_only=False)
-    temp_ws = temp_wb[branch_option]
-    for row in range(1, temp_ws.max_row + 1):
-        for col in range(1, temp_ws.max_column + 1):
-            cell = temp_ws.cell(row=row, column=col)
-            if hasattr(cell, 'comment') and cell.comment and cell.comment.text:
-                if col <= len(df_cols):
-                    comment_columns.add(df_cols[col-1])
-except Exception:
-    pass  # If we can't read comments, just continue with unhidden columns
-
-# Combine unhidden columns with comment columns
-display_cols = list(set(unhidden_cols + list(comment_columns)))
-display_cols.sort(key=lambda x: df_cols.index(x) if x in df_cols else len(df_cols))
-
-# Read Excel comments for highlighting and tooltips
-excel_comments = {}
+# Per-stage timings and peak memory, only when MIS_PROFILE is set
+profiler = StageProfiler.from_env()
+
+# Closed however the run ends (rerun, st.stop, error) so its tracemalloc
+# reference is always released
 try:
-    # Load workbooks for both data and comments
-    data_wb = openpyxl.load_workbook(excel_path, read_only=False, data_only=True)
-    data_ws = data_wb[branch_option]
-    
-    comment_wb = openpyxl.load_workbook(excel_path, read_only=False, data_only=False)
-    comment_ws = comment_wb[branch_option]
-
-    # Read PARTICULARS values from Excel (same sheet as comments)
-    excel_particulars_dict = {}
-    for row in range(2, data_ws.max_row + 1):  # Start from row 2 (skip header)
-        particulars_cell = data_ws.cell(row=row, column=1)
-        if particulars_cell.value:
-            excel_particulars_dict[row] = str(particulars_cell.value).strip()
-
-    # Extract comments from Excel and map to cell values
-    for row in range(1, comment_ws.max_row + 1):
-        for col in range(1, comment_ws.max_column + 1):
-            cell = comment_ws.cell(row=row, column=col)
-            # Check if cell has comment attribute and if it has a comment
-            if hasattr(cell, 'comment') and cell.comment and cell.comment.text:
-                # Skip header row
-                if row > 1 and col > 1:  # Skip header row and first column (row labels)
-                    # Check if this column is in our unhidden columns OR if it has comments
-                    if col in unhidden_col_indexes or True:  # Include all columns to find comments
-                        # Get the corresponding DataFrame column index and name
-                        df_col_idx = col - 1  # Convert 1-based Excel column to 0-based DataFrame index
-
-                        if df_col_idx < len(sheets_data_str[branch_option].columns):
-                            col_name = sheets_data_str[branch_option].columns[df_col_idx]
-                            
-                            # Ensure column name is a string for consistent matching
-                            if hasattr(col_name, 'strftime'):
-                                # Convert datetime to MMM-YY format and then to string
-                                col_name = col_name.strftime('%b-%y')
-                            else:
-                                col_name = str(col_name)
-                            
-                            if row in excel_particulars_dict:
-                                particulars_value = excel_particulars_dict[row]
-                                # Normalize the key: strip, lower case
-                                particulars_value_norm = str(particulars_value).strip().lower()
-                                col_name_norm = str(col_name).strip().lower()
-                                cell_key = f"{particulars_value_norm}|{col_name_norm}"
-                                excel_comments[cell_key] = cell.comment.text.strip()
-
-except Exception as e:
-    st.warning(f"Could not read Excel comments: {e}")
-
-# Filter both columns and rows
-df_to_show = sheets_data_str[branch_option][display_cols].copy()
-if unhidden_row_indexes:
-    # Validate indices before using them
-    valid_indices = [idx for idx in unhidden_row_indexes if idx < len(df_to_show)]
-    if valid_indices:
-        df_to_show = df_to_show.iloc[valid_indices].reset_index(drop=True)
-    else:
-        st.warning("No valid row indices found for filtering")
-
-# Download Excel button (only visible/unhidden columns)
-import io
-from openpyxl import load_workbook
-from openpyxl.styles import PatternFill, Font, Alignment, Border, Side
-# Write to Excel
-towrite = io.BytesIO()
-df_to_show.to_excel(towrite, index=False, engine='openpyxl')
-towrite.seek(0)
-wb = load_workbook(towrite)
-ws = wb.active
-# Header formatting
-header_fill = PatternFill(start_color='003366', end_color='003366', fill_type='solid')
-header_font = Font(bold=True, color='FFFFFF', size=14)
-# Month column formatting
-from datetime import datetime
-month_fmt = '%b-%y'
-for cell in ws[1]:
-    # Try to parse as date for month columns
-    try:
-        # If header looks like a date, format as 'Apr-25'
-        if isinstance(cell.value, str):
-            try:
-                dt = pd.to_datetime(cell.value)
-                cell.value = dt.strftime(month_fmt)
-            except Exception:
-                pass
-        elif isinstance(cell.value, datetime):
-            cell.value = cell.value.strftime(month_fmt)
-    except Exception:
-        pass
-    cell.fill = header_fill
-    cell.font = header_font
-    cell.alignment = Alignment(horizontal='center', vertical='center')
-# If any month columns have date values, format them too
-for c in range(1, ws.max_column+1):
-    col_val = ws.cell(row=1, column=c).value
-    if col_val:
-        try:
-            dt = pd.to_datetime(col_val, errors='coerce')
-            if not pd.isnull(dt):
-                # Format all values in this column if they are dates
-                for r in range(2, ws.max_row+1):
-                    v = ws.cell(row=r, column=c).value
-                    if isinstance(v, datetime):
-                        ws.cell(row=r, column=c).number_format = 'mmm-yy'
-        except Exception:
-            pass
-# Border for all cells
-thin = Side(border_style="thin", color="000000")
-for row in ws.iter_rows():
-    for cell in row:
-        cell.border = Border(top=thin, left=thin, right=thin, bottom=thin)
-# Row/column/number formatting logic
-particulars_col = None
-for idx, cell in enumerate(ws[1], 1):
-    if str(cell.value).strip().lower() == 'particulars':
-        particulars_col = idx
-        break
-if particulars_col:
-    sales_block = False
-    blue_block = False
-    green1_block = False
-    green2_block = False
-    red_block = False
-    for r in range(2, ws.max_row+1):
-        val = ws.cell(row=r, column=particulars_col).value
-        style = None
-        if isinstance(val, str):
-            txt = val.strip().lower()
-            
-            # Block coloring logic (apply first, so specific rows can override)
-            # Sales block: FOOD SALES to TOTAL SALES AND SERVICE CHARGES
-            if txt in ['food sales', 'drinks sales', 'service charge', 'service charge ']:
-                sales_block = True
-            if sales_block:
-                style = {'fill': PatternFill(start_color='fff9c4', end_color='fff9c4', fill_type='solid')}
-                if txt == 'total sales and service charges':
-                    style = {'fill': PatternFill(start_color='ffe066', end_color='ffe066', fill_type='solid'), 'font': Font(bold=True)}
-                    sales_block = False
-            
-            pink_rows = ['less: discount', 'less: adjusted ( net of gst)', 'net discount']
-            if txt in pink_rows:
-                style = {'fill': PatternFill(start_color='ffe6f0', end_color='ffe6f0', fill_type='solid')}
-                if txt == 'net discount':
-                    style['font'] = Font(bold=True)
-            
-            if txt == 'grocery local [fcl]':
-                blue_block = True
-            if blue_block:
-                style = {'fill': PatternFill(start_color='d6f0ff', end_color='d6f0ff', fill_type='solid')}
-            if txt == 'drinks [fcd]':
-                blue_block = False
-            
-            if txt == 'drinks [fcd] - alco':
-                green1_block = True
-            if green1_block:
-                style = {'fill': PatternFill(start_color='e6ffe6', end_color='e6ffe6', fill_type='solid')}
-            if txt == 'drinks [fcd] - non alco':
-                green1_block = False
-            
-            if txt == 'add: opening inventory (alco)':
-                green2_block = True
-            if green2_block:
-                style = {'fill': PatternFill(start_color='e6ffe6', end_color='e6ffe6', fill_type='solid')}
-            if txt == 'add: closing inventory (non-alco)':
-                green2_block = False
-            
-            if txt == 'bank charges/credit card charges':
-                red_block = True
-            if red_block:
-                style = {'fill': PatternFill(start_color='ffe6e6', end_color='ffe6e6', fill_type='solid')}
-            if txt == 'license fees':
-                red_block = False
-            
-            # Specific row styling (overrides block colors)
-            if txt == 'net sale':
-                style = {'fill': PatternFill(start_color='e75480', end_color='e75480', fill_type='solid'), 'font': Font(bold=True)}
-            elif txt == 'cost of food sold':
-                style = {'font': Font(bold=True, underline='single')}
-            elif txt == 'total food cost':
-                style = {'fill': PatternFill(start_color='4f81bd', end_color='4f81bd', fill_type='solid'), 'font': Font(bold=True, color='FFFFFF')}
-            elif txt in ['add: opening inventory (food)', 'less: closing inventory (food)']:
-                style = {'fill': PatternFill(start_color='d6f0ff', end_color='d6f0ff', fill_type='solid')}
-            elif txt == 'less: taxes (1/3rd)':
-                style = {'fill': PatternFill(start_color='fffacd', end_color='fffacd', fill_type='solid'), 'font': Font(bold=True)}
-            elif txt == 'net food cost':
-                style = {'fill': PatternFill(start_color='4f81bd', end_color='4f81bd', fill_type='solid'), 'font': Font(bold=True, color='FFFFFF')}
-            elif txt == 'disbursement':
-                style = {'fill': PatternFill(start_color='4f81bd', end_color='4f81bd', fill_type='solid'), 'font': Font(bold=True, color='FFFFFF')}
-            elif txt == 'cost of drinks sold':
-                style = {'font': Font(bold=True, underline='single')}
-            elif txt == 'total drinks cost' or txt == 'net drink cost':
-                style = {'fill': PatternFill(start_color='5cb85c', end_color='5cb85c', fill_type='solid'), 'font': Font(bold=True, color='FFFFFF')}
-            elif txt == 'gross profit':
-                style = {'fill': PatternFill(start_color='d9534f', end_color='d9534f', fill_type='solid'), 'font': Font(bold=True, color='FFFFFF')}
-            elif txt in ['expenses', 'expenses ']:
-                style = {'font': Font(bold=True, underline='single')}
-            elif txt == 'total non operating cost':
-                style = {'fill': PatternFill(start_color='ff9900', end_color='ff9900', fill_type='solid'), 'font': Font(bold=True)}
-            elif txt == 'net profit':
-                style = {'fill': PatternFill(start_color='b30000', end_color='b30000', fill_type='solid'), 'font': Font(bold=True, color='FFFFFF')}
-            # Apply style to the row
-            if style:
-                for c in range(1, ws.max_column+1):
-                    if 'fill' in style:
-                        ws.cell(row=r, column=c).fill = style['fill']
-                    if 'font' in style:
-                        ws.cell(row=r, column=c).font = style['font']
-# Number formatting
-# First, find the row numbers for NET PROFIT and Less: Taxes
-net_profit_row = None
-taxes_row = None
-for r in range(2, ws.max_row+1):
-    val = ws.cell(row=r, column=particulars_col).value
-    if isinstance(val, str):
-        txt = val.strip().lower()
-        if txt == 'net profit':
-            net_profit_row = r
-        elif txt == 'less: taxes (1/3rd)':
-            taxes_row = r
-            break
-
-for c in range(1, ws.max_column+1):
-    col_name = ws.cell(row=1, column=c).value
-    # Check if this is a percentage column
-    is_percent_col = col_name and isinstance(col_name, str) and ('%' in col_name or col_name.strip().startswith('%') or col_name.strip().endswith('%'))
-    
-    for r in range(2, ws.max_row+1):
-        try:
-            val = ws.cell(row=r, column=c).value
-            if isinstance(val, (int, float)) and val != 0:
-                # Check if this row is between NET PROFIT and Less: Taxes - if so, use number format
-                in_special_zone = net_profit_row and taxes_row and net_profit_row < r < taxes_row
-                
-                if is_percent_col and not in_special_zone:
-                    # For percentage columns, format as percentage (except in special zone)
-                    ws.cell(row=r, column=c).number_format = '0.00%'
-                else:
-                    # For regular number columns or special zone, use Indian number format
-                    ws.cell(row=r, column=c).number_format = '#,##,##0'
-        except Exception:
-            pass
-# Autosize columns
-from openpyxl.utils import get_column_letter
-for col in ws.columns:
-    max_length = 0
-    col_letter = get_column_letter(col[0].column)
-    col_header = ws.cell(row=1, column=col[0].column).value
-    
-    # Check if this is a percentage column
-    is_percent_col = col_header and isinstance(col_header, str) and ('%' in col_header or col_header.strip().startswith('%') or col_header.strip().endswith('%'))
-    
-    for cell in col:
-        try:
-            if cell.value:
-                max_length = max(max_length, len(str(cell.value)))
-        except:
-            pass
-    
-    # Set width: smaller for percentage columns, normal for others
-    if is_percent_col:
-        ws.column_dimensions[col_letter].width = min(max_length + 2, 10)  # Max 10 for % columns
-    else:
-        ws.column_dimensions[col_letter].width = max_length + 2
-# Save to buffer
-styled_buf = io.BytesIO()
-wb.save(styled_buf)
-styled_buf.seek(0)
-
-# Get the latest month from the dataframe columns
-latest_month = None
-for col in df_to_show.columns:
-    if col != 'PARTICULARS' and col != 'Branch':
-        try:
-            # Try to parse as date
-            date_val = pd.to_datetime(col)
-            if latest_month is None or date_val > latest_month:
-                latest_month = date_val
-        except:
-            pass
-
-# Format the latest month as mmm-yy
-if latest_month:
-    month_str = latest_month.strftime('%b-%y')
-    file_name = f'P&L - Niko Foods LLP - {month_str}.xlsx'
-else:
-    file_name = 'P&L - Niko Foods LLP.xlsx'
-
-# Create title row with download button
-col1, col3 = st.columns([4, 1])
-with col1:
-    st.title("Niko Foods Profitability Dashboard")
-with col3:
-    st.write("")  # Add spacing
-    st.download_button(
-        label='📥 Download',
-        data=styled_buf,
-        file_name=file_name,
-        mime='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-        key=f'download_excel_{branch_option}',
-        use_container_width=True
+    # Load every branch P&L sheet from Excel
+    file_path = os.path.join(os.path.dirname(__file__), "Bomba Foods-MIS.xlsx")
+    if not os.path.exists(file_path):
+        st.error(f"Excel file '{file_path}' not found in this directory.")
+        st.stop()
+
+    DEFAULT_BRANCH = DEFAULT_SHEET
+
+    # Sidebar control to force a re-read after the workbook was replaced in place
+    if st.sidebar.button('🔄 Reload workbook'):
+        workbook_cache.invalidate(file_path)
+
+    # A background watcher reloads the workbook when it is overwritten, reparsing
+    # only the sheets that changed; every session polls its version and reruns
+    WATCH_INTERVAL = 3
+    workbook_watcher = watch(file_path, workbook_cache, interval=WATCH_INTERVAL)
+    st.session_state['workbook_version'] = workbook_watcher.version
+
+
+    @st.fragment(run_every=WATCH_INTERVAL)
+    def workbook_refresh():
+        if workbook_watcher.version != st.session_state['workbook_version']:
+            st.rerun()
+        if workbook_watcher.error is not None:
+            # A half-saved or locked file keeps the last good figures on screen
+            st.warning(f'Workbook could not be reloaded, showing the last version that loaded: {workbook_watcher.error}')
+
+
+    with st.sidebar:
+        workbook_refresh()
+    if workbook_watcher.last_change is not None:
+        changed_at, changed = workbook_watcher.last_change
+        st.sidebar.caption(
+            f"Workbook updated {datetime.fromtimestamp(changed_at):%H:%M:%S}: "
+            + (', '.join(f'{name} ({kind})' for name, kind in changed.items()) or 'no sheet changes')
+        )
+
+    # Every 'P&L (...)' sheet is a branch. All of them are ingested together (one
+    # process per sheet on large workbooks) and shared by every session until the
+    # workbook's content hash changes.
+    with profiler.stage('load'):
+        branch_models = workbook_cache.get_sheet_models(file_path)
+        consolidated_model = workbook_cache.get_or_build(
+            file_path, 'consolidated', lambda _: consolidate_models(branch_models),
+        )
+    branch_names = list(branch_models)
+    # Content hash of the loaded workbook; part of every rendered-output cache key
+    workbook_digest = workbook_cache.file_key(file_path)[2]
+
+    branch_option = st.sidebar.selectbox(
+        'Branch',
+        branch_names + [CONSOLIDATED_NAME],
+        index=branch_names.index(DEFAULT_BRANCH) if DEFAULT_BRANCH in branch_names else 0,
     )
+    sheet_model = branch_models.get(branch_option, consolidated_model)
+
+    # 'Auto' switches to the windowed grid once the table passes GRID_CELL_THRESHOLD cells
+    GRID_CELL_THRESHOLD = 5000
+    table_mode = st.sidebar.radio('Table view', ['Auto', 'Full table', 'Virtualized'], horizontal=True)
+
+    # Row colours are resolved over the whole sheet so blocks whose start or end
+    # row is hidden still close where the workbook says they do
+    with profiler.stage('row_styles'):
+        sheet_row_styles = workbook_cache.get_or_build(
+            file_path, ('row_styles', branch_option),
+            lambda _: compile_row_styles(sheet_model.numbers['PARTICULARS']),
+        )
+
+    # MoM / YoY / YTD / trailing-average / share-of-net-sale figures for every
+    # line and month, computed once per sheet and shared like the models
+    with profiler.stage('periods'):
+        sheet_periods = workbook_cache.get_or_build(
+            file_path, ('periods', branch_option), lambda _: period_table(sheet_model),
+        )
+
+    # Download Excel button (only visible/unhidden columns). The workbook is built
+    # on a background thread as soon as the sheet is loaded, so the title, table and
+    # KPIs render without waiting for it; the button turns ready when it is done.
+    # Export keeps hidden columns that carry comments; rows follow the sheet's hidden rows
+    export_schema = sheet_model.visible_schema(include_comment_cols=True)
+    # Named after the latest exported month; other branches are named in the file
+    file_name = export_file_name(branch_option, export_schema)
+    export_key = ('export', workbook_digest, branch_option, RULES_VERSION)
+    EXPORT_POLL_SECONDS = 1
+
+
+    # Arguments are bound now: the build may outlive this run and the next run
+    # rebinds sheet_model and friends
+    def styled_export_bytes(model=sheet_model, row_styles=sheet_row_styles, schema=export_schema, branch=branch_option):
+        # Runs on an export thread; timed by its own profiler, logged as an 'export' record
+        export_profiler = StageProfiler(enabled=profiler.enabled, memory=False, log_path=profiler.log_path)
+        with export_profiler.stage('export_build'):
+            data = build_styled_export(
+                model.visible_frame(include_comment_cols=True), row_styles[model.visible_rows], schema=schema,
+            )
+        export_profiler.flush(branch=branch, event='export')
+        return data
+
+
+    export_jobs.submit(export_key, styled_export_bytes)
+
+
+    def export_failed():
+        # A failed build stays failed for this workbook, sheet and rule set until Retry
+        st.button('⚠️ Export failed', disabled=True, help=str(export_jobs.error(export_key)),
+                  key=f'download_failed_{branch_option}', use_container_width=True)
+        st.button('Retry export', on_click=export_jobs.retry, args=(export_key, styled_export_bytes),
+                  key=f'download_retry_{branch_option}', use_container_width=True)
+
+
+    @st.fragment(run_every=EXPORT_POLL_SECONDS)
+    def export_pending():
+        # Once the build finishes the page reruns and swaps in the real button
+        status = export_jobs.status(export_key)
+        if status == 'ready':
+            st.rerun()
+        if status is None:
+            # Finished bytes were evicted from the export cache; build them again
+            export_jobs.submit(export_key, styled_export_bytes)
+        if status == 'failed':
+            export_failed()
+        else:
+            st.button('⏳ Preparing…', disabled=True, key=f'download_pending_{branch_option}', use_container_width=True)
+
+
+    # Create title row with download button
+    col1, col3 = st.columns([4, 1])
+    with col1:
+        st.title("Niko Foods Profitability Dashboard")
+    with col3:
+        st.write("")  # Add spacing
+        export_data = export_jobs.result(export_key)
+        if export_data is not None:
+            st.download_button(
+                label='📥 Download',
+                data=export_data,
+                file_name=file_name,
+                mime='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+                key=f'download_excel_{branch_option}',
+                use_container_width=True
+            )
+        elif export_jobs.status(export_key) == 'failed':
+            export_failed()
+        else:
+            export_pending()
 
-# The table display remains below this logic
-
-# Determine unhidden columns for the selected branch using openpyxl
-import openpyxl
-excel_path = file_path
-wb = openpyxl.load_workbook(excel_path, read_only=False, data_only=True)
-ws = wb[branch_option]
-
-# Get indexes of unhidden columns (1-based for openpyxl)
-unhidden_col_indexes = [
-    idx for idx, col in enumerate(ws.iter_cols(1, ws.max_column), 1)
-    if not ws.column_dimensions[openpyxl.utils.get_column_letter(idx)].hidden
-]
+    # The table display remains below this logic
 
-# Get indexes of unhidden rows (1-based for openpyxl, skip header row)
-unhidden_row_indexes = [
-    idx - 2 for idx in range(2, ws.max_row + 1)  # -2 to convert to 0-based pandas index (row 2 in Excel = index 0 in pandas)
-    if not ws.row_dimensions[idx].hidden
-]
+    # Sheet sections (Sales, Food cost, ..., Expenses, Disbursements) of every row
+    sheet_sections = workbook_cache.get_or_build(
+        file_path, ('sections', branch_option), lambda _: row_sections(sheet_model.numbers['PARTICULARS']),
+    )
 
-# Map to DataFrame column names (0-based for pandas)
-df_cols = list(sheets_data_str[branch_option].columns)
-unhidden_cols = [df_cols[idx-1] for idx in unhidden_col_indexes if idx-1 < len(df_cols)]
 
-import numpy as np
-import re
-from datetime import datetime
-
-df_to_show = sheets_data_str[branch_option][unhidden_cols].copy()
-if unhidden_row_indexes:
-    df_to_show = df_to_show.iloc[unhidden_row_indexes].reset_index(drop=True)
-
-def indian_number_format(val):
-    try:
-        x = int(round(float(val)))
-        s = str(x)[::-1]
-        groups = []
-        groups.append(s[:3])
-        s = s[3:]
-        while s:
-            groups.append(s[:2])
-            s = s[2:]
-        return ','.join(groups)[::-1]
-    except Exception:
-        return ''
-
-def format_percent(val):
-    try:
-        if pd.isnull(val) or val == '' or float(val) == 0:
-            return ''
-        return f"{float(val)*100:.2f}%"
-    except Exception:
-        return ''
-
-def excel_month_fmt(col):
-    # If column is datetime or looks like a month, format as 'Apr-25'
-    if isinstance(col, datetime):
-        return col.strftime('%b-%y')
-    if isinstance(col, str):
-        try:
-            dt = pd.to_datetime(col)
-            return dt.strftime('%b-%y')
-        except Exception:
-            return col
-    return col
-
-# Format headers
-new_cols = []
-for col in df_to_show.columns:
-    new_cols.append(excel_month_fmt(col))
-df_to_show.columns = new_cols
-
-# Format values
-skip_cols = []
-for col in df_to_show.columns:
-    if col.lower() == 'particulars' or col.lower() == 'branch' or col == '%' or str(col).strip().startswith('%') or str(col).strip().endswith('%'):
-        skip_cols.append(col)
-
-# Find index of 'Net Profit' row in 'PARTICULARS' column (case-insensitive)
-net_profit_idx = None
-for i, val in enumerate(df_to_show['PARTICULARS']):
-    if isinstance(val, str) and val.strip().lower().startswith('net profit'):
-        net_profit_idx = i
-        break
-
-# Apply formatting for rows before or at 'Net Profit'
-for col in df_to_show.columns:
-    if col in skip_cols:
-        # Format % columns
-        if col == '%' or str(col).strip().startswith('%') or str(col).strip().endswith('%'):
-            df_to_show.loc[:net_profit_idx, col] = df_to_show.loc[:net_profit_idx, col].apply(format_percent)
+    # Filters, table and trend chart rerun on their own: moving the month range,
+    # picking sections or comparison columns slices the cached typed block and
+    # re-renders this fragment only, not the load, KPIs or export of the page
+    @st.fragment
+    def table_section():
+        filter_cols = st.columns([3, 2, 2])
+        # Only months the sheet shows can be picked; hidden ones stay hidden
+        shown_cols = set(sheet_model.visible_col_positions)
+        sheet_months = [info for info in sheet_model.schema.months if info.position in shown_cols]
+        month_range = (sheet_months[0], sheet_months[-1]) if sheet_months else (None, None)
+        if len(sheet_months) > 1:
+            month_range = filter_cols[0].select_slider(
+                'Months', options=sheet_months, value=month_range, format_func=lambda info: info.display,
+                key=f'month_range_{branch_option}',
+            )
+        sections = filter_cols[1].multiselect(
+            'Sections', SECTION_NAMES, default=SECTION_NAMES, key=f'sections_{branch_option}',
+        )
+        period_columns = filter_cols[2].multiselect(
+            'Comparison columns', [key for key, _, _ in METRICS], format_func=METRIC_HEADERS.get,
+            help='Added after each month in the table',
+        )
+
+        # Rows and columns of the view, as sheet positions; the unfiltered view is the sheet's visible cells
+        view_rows = sheet_model.visible_rows
+        if set(sections) != set(SECTION_NAMES):
+            view_rows = section_rows(sheet_sections, sections, view_rows)
+        view_cols = sheet_model.visible_col_positions
+        windowed = bool(sheet_months) and month_range != (sheet_months[0], sheet_months[-1])
+        if windowed:
+            view_cols = month_window(sheet_model.schema, view_cols, month_range[0].month, month_range[1].month)
+
+        # Large views go to the windowed grid, which only puts the cells in view into
+        # the page; small ones keep the single HTML table
+        table_cells = len(view_rows) * len(view_cols)
+        use_grid = table_mode == 'Virtualized' or (table_mode == 'Auto' and table_cells > GRID_CELL_THRESHOLD)
+
+        def render_table():
+            """``(html, grid height or None, has comments)`` for the current view."""
+            # The typed numeric block is sliced; text only appears at formatting
+            with profiler.stage('row_column_filter'):
+                df_to_show = sheet_model.numbers_at(view_rows, view_cols)
+                table_notes = sheet_model.notes_at(view_rows, view_cols)
+                # Column kinds and header text ('Apr-25', '%') come from the model's schema
+                table_schema = sheet_model.schema.select([sheet_model.columns[pos] for pos in view_cols])
+
+            # Comments are looked up by (row, column) in the displayed grid
+            with profiler.stage('comment_scan'):
+                display_comments = sheet_model.comments_at(view_rows, view_cols)
+
+            # Selected comparison columns go in after each month; notes and comments move with their cells
+            with profiler.stage('period_columns'):
+                df_to_show, table_schema, table_notes, display_comments = add_period_columns(
+                    df_to_show, table_schema, sheet_periods, period_columns, view_rows,
+                    table_notes, display_comments,
+                )
+
+            # Format values: Indian grouping and percentages, applied per column block
+            with profiler.stage('format'):
+                df_to_show = format_pl_frame(df_to_show, table_schema, table_notes)
+            visible_row_styles = sheet_row_styles[view_rows]
+
+            if use_grid:
+                with profiler.stage('html_build'):
+                    grid_html, grid_height = grid_document(df_to_show, visible_row_styles, display_comments, table_schema)
+                return grid_html, grid_height, bool(display_comments)
+            with profiler.stage('highlight_sales_block'):
+                table_styler = style_table(df_to_show, visible_row_styles, display_comments, table_schema)
+            with profiler.stage('html_build'):
+                table_html = table_styler.to_html(escape=False, cell_comments=cell_comment_ids(display_comments))
+            return table_html, None, bool(display_comments)
+
+        # Finished HTML is reused until the workbook, the sheet, the view or the style
+        # rules change, so reruns from unrelated widgets skip the render pipeline
+        view_key = (
+            'grid' if use_grid else 'html',
+            tuple(info.display for info in month_range if info is not None),
+            tuple(sections), tuple(period_columns),
+        )
+        table_html, grid_height, has_comments = fragment_cache.get_or_build(
+            ('table', workbook_digest, branch_option) + view_key + (RULES_VERSION,),
+            render_table,
+        )
+        if use_grid:
+            if hasattr(st, 'iframe'):
+                st.iframe(table_html, height=grid_height)
+            else:  # Streamlit releases before st.iframe
+                import streamlit.components.v1 as components
+
+                components.html(table_html, height=grid_height)
         else:
-            df_to_show.loc[:net_profit_idx, col] = df_to_show.loc[:net_profit_idx, col].replace([None, np.nan], '')
-    else:
-        # Format all other columns as Indian numbers
-        df_to_show.loc[:net_profit_idx, col] = df_to_show.loc[:net_profit_idx, col].apply(lambda x: indian_number_format(x) if pd.notnull(x) and x != '' else '')
-
-# For rows after Net Profit, do not move names; format numbers only
-if net_profit_idx is not None:
-    for i in range(net_profit_idx+1, len(df_to_show)):
-        row = df_to_show.iloc[i]
-        for col in df_to_show.columns:
-            val = row[col]
-            # Only format if it's a number
-            try:
-                # If value is numeric, format as Indian number
-                if isinstance(val, (int, float)) and not pd.isnull(val):
-                    df_to_show.at[i, col] = indian_number_format(val)
-                # If value is string but represents a number
-                elif isinstance(val, str) and val.replace(',', '').replace('.', '').isdigit():
-                    df_to_show.at[i, col] = indian_number_format(val)
-                # Else leave as-is (expense name or blank)
-            except Exception:
-                pass
-
-# Ensure all None and np.nan are shown as blanks
-df_to_show = df_to_show.replace([None, np.nan], '')
-
-def highlight_sales_block(df, excel_comments):
-    sales_start = "SALES"
-    sales_end = "TOTAL SALES AND SERVICE CHARGES"
-    pink_rows = ["LESS: DISCOUNT", "LESS: ADJUSTED ( NET OF GST)", "NET DISCOUNT"]
-    highlight = False
-    highlights = []
-    
-    for row_idx, row in df.iterrows():
-        row_styles = ['' for _ in row]
-        if isinstance(row['PARTICULARS'], str):
-            particulars = row['PARTICULARS'].strip().lower()
-            # Deep pink Net Sale row
-            if particulars == "net sale":
-                row_styles = ['background-color: #e75480; font-weight: bold' for _ in row]
-            # Bold and underline COST OF FOOD SOLD
-            elif particulars == "cost of food sold":
-                row_styles = ['font-weight: bold; text-decoration: underline' for _ in row]
-            # Deeper blue and bold TOTAL FOOD COST
-            elif particulars == "total food cost":
-                row_styles = ['background-color: #4f81bd; color: white; font-weight: bold' for _ in row]
-            # Light blue for inventory rows
-            elif particulars in ["add: opening inventory", "less: closing inventory"]:
-                row_styles = ['background-color: #d6f0ff' for _ in row]
-            # Light yellow for taxes
-            elif particulars == "less: taxes (1/3rd)":
-                row_styles = ['background-color: #fffacd; font-weight: bold' for _ in row]
-            # Deeper blue and bold NET FOOD COST
-            elif particulars == "net food cost":
-                row_styles = ['background-color: #4f81bd; color: white; font-weight: bold' for _ in row]
-            # Deep blue and bold DISBURSEMENT
-            elif particulars == "disbursement":
-                row_styles = ['background-color: #4f81bd; color: white; font-weight: bold' for _ in row]
-            else:
-                # Light blue block: GROCERY [FCL] to DRINKS [FCD]
-                blue_start = "grocery [fcl]"
-                blue_end = "drinks [fcd]"
-                if not hasattr(highlight_sales_block, 'in_blue_block'):
-                    highlight_sales_block.in_blue_block = False
-                if blue_start == particulars:
-                    highlight_sales_block.in_blue_block = True
-                if highlight_sales_block.in_blue_block:
-                    row_styles = ['background-color: #d6f0ff' for _ in row]
-                if blue_end == particulars:
-                    highlight_sales_block.in_blue_block = False
-
-                # Light green block: DRINKS [FCD] - ALCO to DRINKS [FCD] - NON ALCO
-                green1_start = "drinks [fcd] - alco"
-                green1_end = "drinks [fcd] - non alco"
-                if not hasattr(highlight_sales_block, 'in_green1_block'):
-                    highlight_sales_block.in_green1_block = False
-                if green1_start == particulars:
-                    highlight_sales_block.in_green1_block = True
-                if highlight_sales_block.in_green1_block:
-                    row_styles = ['background-color: #e6ffe6' for _ in row]
-                if green1_end == particulars:
-                    highlight_sales_block.in_green1_block = False
-
-                # Light green block: ADD: OPENING INVENTORY (ALCO) to ADD: CLOSING INVENTORY (NON-ALCO)
-                green2_start = "add: opening inventory (alco)"
-                green2_end = "add: closing inventory (non-alco)"
-                if not hasattr(highlight_sales_block, 'in_green2_block'):
-                    highlight_sales_block.in_green2_block = False
-                if green2_start == particulars:
-                    highlight_sales_block.in_green2_block = True
-                if highlight_sales_block.in_green2_block:
-                    row_styles = ['background-color: #e6ffe6' for _ in row]
-                if green2_end == particulars:
-                    highlight_sales_block.in_green2_block = False
-
-                # Bold and underline COST OF DRINKS SOLD
-                if particulars == "cost of drinks sold":
-                    row_styles = ['font-weight: bold; text-decoration: underline' for _ in row]
-                # Deeper green and bold TOTAL DRINKS COST
-                elif particulars == "total drinks cost":
-                    row_styles = ['background-color: #5cb85c; color: white; font-weight: bold' for _ in row]
-                # Deeper green and bold NET DRINK COST
-                elif particulars == "net drink cost":
-                    row_styles = ['background-color: #5cb85c; color: white; font-weight: bold' for _ in row]
-                # Deep red and bold Gross Profit
-                elif particulars == "gross profit":
-                    row_styles = ['background-color: #d9534f; color: white; font-weight: bold' for _ in row]
-                # Bold and underline Expenses
-                elif particulars == "expenses":
-                    row_styles = ['font-weight: bold; text-decoration: underline' for _ in row]
-                # Light red block: BANK CHARGES/CREDIT CARD CHARGES to LICENSE FEES
-                else:
-                    red_start = "bank charges/credit card charges"
-                    red_end = "license fees"
-                    if not hasattr(highlight_sales_block, 'in_red_block'):
-                        highlight_sales_block.in_red_block = False
-                    if red_start == particulars:
-                        highlight_sales_block.in_red_block = True
-                    if highlight_sales_block.in_red_block:
-                        row_styles = ['background-color: #ffe6e6' for _ in row]
-                    if red_end == particulars:
-                        highlight_sales_block.in_red_block = False
-                    # Bold and orange TOTAL NON OPERATING COST
-                    if particulars == "total non operating cost":
-                        row_styles = ['background-color: #ff9900; font-weight: bold' for _ in row]
-                    # Bold and deep red NET PROFIT
-                    elif particulars == "net profit":
-                        row_styles = ['background-color: #b30000; color: white; font-weight: bold' for _ in row]
-
-                # Pink block
-                for pink in pink_rows:
-                    if pink.lower() == particulars:
-                        if pink == "NET DISCOUNT":
-                            row_styles = ['background-color: #ffe6f0; font-weight: bold' for _ in row]
-                        else:
-                            row_styles = ['background-color: #ffe6f0' for _ in row]
-                        break
-                else:  # Only check sales block if not pink or net sale or cost of food sold or blue/green/red blocks
-                    if sales_start.lower() in particulars:
-                        highlight = True
-                    if highlight:
-                        if sales_end.lower() in particulars:
-                            row_styles = ['background-color: #ffe066; font-weight: bold' for _ in row]
-                            highlight = False
-                        else:
-                            row_styles = ['background-color: #fff9c4' for _ in row]
-        
-        # Apply automatic highlighting for cells with Excel comments (overrides default styling)
-        particular_val = row['PARTICULARS']
-        for col_idx, col_name in enumerate(df.columns):
-            # Ensure column name is a string for consistent matching
-            if hasattr(col_name, 'strftime'):
-                # Convert datetime to string format
-                formatted_col_name = col_name.strftime('%Y-%m-%d')
-            else:
-                formatted_col_name = str(col_name)
-            
-            # Normalize particulars and column name for comment key
-            particular_val_norm = str(particular_val).strip().lower() if not isinstance(particular_val, str) else particular_val.strip().lower()
-            col_name_norm = formatted_col_name.strip().lower()
-            cell_key = f"{particular_val_norm}|{col_name_norm}"
-
-            # Check if cell has an Excel comment - highlight it
-            if cell_key in excel_comments:
-                # Highlight cells with Excel comments (light blue with red border)
-                row_styles[col_idx] = 'background-color: #ADD8E6 !important; border: 2px solid #FF6347 !important; font-weight: bold !important; position: relative'
-        
-        highlights.append(row_styles)
-    return pd.DataFrame(highlights, columns=df.columns)
-
-def style_table(df):
-    # Identify month columns (columns that look like 'Jul-25', 'Aug-25', etc.)
-    month_pattern = r'^[A-Z][a-z]{2}-\d{2}$'
-    month_cols = [col for col in df.columns if re.match(month_pattern, str(col))]
-    
-    # Build table styles
-    table_styles = [
-        {
-            'selector': 'th',
-            'props': [
-                ('background-color', '#003366'),
-                ('color', 'white'),
-                ('font-weight', 'bold'),
-                ('font-size', '16px'),
-                ('text-align', 'center')
-            ]
-        },
-        {
-            'selector': 'td',
-            'props': [
-                ('text-align', 'center')
+            # Add tooltip/hover info for cells with Excel comments
+            if has_comments:
+                # Add CSS for Excel comment tooltips
+                st.markdown("""
+                <style>
+                /* Tooltip styling for cells with Excel comments */
+                .freeze-header-table-container td[data-comment] {
+                    position: relative !important;
+                    cursor: help !important;
+                }
+
+                .freeze-header-table-container td[data-comment]:hover::after {
+                    content: attr(data-comment);
+                    position: absolute !important;
+                    background: rgba(70, 130, 180, 0.95) !important;
+                    color: white !important;
+                    padding: 10px 15px !important;
+                    border-radius: 8px !important;
+                    font-size: 13px !important;
+                    font-family: Arial, sans-serif !important;
+                    white-space: pre-wrap !important;
+                    max-width: 350px !important;
+                    min-width: 200px !important;
+                    z-index: 1000 !important;
+                    bottom: 100% !important;
+                    left: 50% !important;
+                    transform: translateX(-50%) !important;
+                    margin-bottom: 8px !important;
+                    box-shadow: 0 4px 12px rgba(0,0,0,0.4) !important;
+                    pointer-events: none !important;
+                    line-height: 1.4 !important;
+                }
+
+                /* Add a small indicator that this cell has an Excel comment */
+                .freeze-header-table-container td[data-comment]::before {
+                    content: "💬";
+                    position: absolute !important;
+                    top: 2px !important;
+                    right: 2px !important;
+                    font-size: 10px !important;
+                    opacity: 0.7 !important;
+                    z-index: 1 !important;
+                    color: #FF6347 !important;
+                }
+                </style>
+                """, unsafe_allow_html=True)
+
+            st.markdown(
+                f'<div class="freeze-header-table-container">{table_html}</div>',
+                unsafe_allow_html=True
+            )
+
+        # Any line of the selected sheet over time (the chosen months when the
+        # range is narrowed), with period comparisons as extra series
+        trend_rows = [row for row in range(sheet_periods.n_rows) if sheet_model.particulars[row]]
+        if trend_rows and sheet_periods.months:
+            st.markdown('#### Trends')
+            default_row = sheet_model.row_of('NET PROFIT')
+            trend_row = st.selectbox(
+                'Trend line', trend_rows, format_func=lambda row: sheet_model.particulars[row],
+                index=trend_rows.index(default_row) if default_row in trend_rows else 0,
+                key=f'trend_line_{branch_option}',
+            )
+            trend_series = st.multiselect(
+                'Series', [None] + [key for key, _, _ in METRICS], default=[None, 'trailing'],
+                format_func=lambda key: 'Value' if key is None else METRIC_HEADERS[key],
+            )
+            if trend_series:
+                trend = pd.concat([sheet_periods.series(trend_row, key) for key in trend_series], axis=1)
+                if windowed:
+                    trend = trend.loc[month_range[0].month:month_range[1].month]
+                st.line_chart(trend)
+
+        # A rerun of this fragment alone is logged as its own record
+        if page_logged:
+            profiler.flush(branch=branch_option, event='table')
+
+
+    page_logged = False
+    table_section()
+
+
+    # Summary Reports & Charts
+    st.markdown("---")
+    st.header("Summary Reports & Charts")
+
+    # KPI Tiles for the selected month (selected branch only), latest by default
+    kpi_months = sheet_model.schema.months
+    if kpi_months:
+        kpi_month = st.selectbox(
+            'KPI month', kpi_months, index=len(kpi_months) - 1, format_func=lambda info: info.display,
+            key=f'kpi_month_{branch_option}',
+        )
+        # Show tiles: 3 per row, smaller, colored
+        kpi_title = 'Latest Month KPIs' if kpi_month == kpi_months[-1] else 'KPIs'
+        st.markdown(f'#### {kpi_title} ({kpi_month.display})')
+
+        def render_kpi_tiles():
+            with profiler.stage('kpis'):
+                _, kpi_results = kpi_tiles(sheet_model, kpi_month)
+            colors = [
+                '#e3f2fd', '#fff9c4', '#ffe0b2', '#c8e6c9', '#f8bbd0', '#d1c4e9'
             ]
+            tile_html = """
+            <style>
+            .kpi-row {{ display: flex; flex-wrap: wrap; gap: 1rem; margin-bottom: 1rem; }}
+            .kpi-tile {{
+                flex: 1 1 calc(33% - 1rem);
+                min-width: 180px;
+                background: {bg};
+                border-radius: 12px;
+                padding: 0.7rem 0.5rem 0.5rem 0.5rem;
+                box-shadow: 0 2px 8px rgba(0,0,0,0.04);
+                text-align: center;
+                margin-bottom: 0.5rem;
+            }}
+            .kpi-label {{ font-size: 1rem; color: #333; margin-bottom: 0.2rem; font-weight: 600; }}
+            .kpi-value {{ font-size: 1.5rem; color: #003366; font-weight: bold; letter-spacing: 1px; }}
+            @media (max-width: 800px) {{
+                .kpi-tile {{ flex: 1 1 100%; min-width: 140px; }}
+            }}
+            </style>
+            <div class="kpi-row">
+            {tiles}
+            </div>
+            """
+            tiles = ""
+            for idx, (kpi_name, value_fmt) in enumerate(kpi_results):
+                bg = colors[idx % len(colors)]
+                tiles += f'<div class="kpi-tile" style="background:{bg}"><div class="kpi-label">{kpi_name}</div><div class="kpi-value">{value_fmt}</div></div>'
+            return tile_html.format(tiles=tiles, bg='{bg}')
+
+        st.markdown(
+            fragment_cache.get_or_build(('kpis', workbook_digest, branch_option, kpi_month.display), render_kpi_tiles),
+            unsafe_allow_html=True,
+        )
+
+    # Sales and profit trends across branches, where the sheets carry them
+    with profiler.stage('charts'):
+        for fig in trend_figures(branch_models):
+            st.plotly_chart(fig, use_container_width=True)
+
+    # History across a folder of monthly MIS workbooks (MIS_HISTORY_DIR); only
+    # workbooks added or changed since the last run are parsed
+    history_dir = os.environ.get('MIS_HISTORY_DIR')
+    if history_dir and os.path.isdir(history_dir):
+        with profiler.stage('history'):
+            history = load_history(history_dir)
+        if len(history.frame):
+            st.markdown('#### History')
+            history_line = st.selectbox('Line', history.lines, key='history_line')
+            st.line_chart(history.table(history_line))
+
+    # Stage timings for this run (MIS_PROFILE=1); also appended to mis_profile.jsonl,
+    # with the hit/miss counters of the process-wide caches every session shares
+    if profiler.enabled:
+        cache_stats = {
+            'workbook': workbook_cache.stats(),
+            'fragments': fragment_cache.stats(),
+            'exports': export_cache.stats(),
         }
-    ]
-    
-    # Add specific width for month columns
-    for idx, col in enumerate(df.columns):
-        if col in month_cols:
-            table_styles.append({
-                'selector': f'th:nth-child({idx+1}), td:nth-child({idx+1})',
-                'props': [
-                    ('min-width', '120px'),
-                    ('max-width', '120px'),
-                    ('width', '120px'),
-                    ('text-align', 'center')
-                ]
-            })
-        elif col == 'PARTICULARS':
-            table_styles.append({
-                'selector': f'th:nth-child({idx+1}), td:nth-child({idx+1})',
-                'props': [
-                    ('text-align', 'left'),
-                    ('min-width', '250px')
-                ]
-            })
-        elif '%' in str(col):
-            table_styles.append({
-                'selector': f'th:nth-child({idx+1}), td:nth-child({idx+1})',
-                'props': [
-                    ('min-width', '80px'),
-                    ('max-width', '80px'),
-                    ('width', '80px'),
-                    ('text-align', 'center')
-                ]
-            })
-    
-    styler = df.style.set_table_styles(table_styles).hide(axis='index')
-    return styler.apply(highlight_sales_block, axis=None, excel_comments=excel_comments)
-
-# Display the table
-table_html = style_table(df_to_show).to_html(escape=False)
-
-# Add tooltip/hover info for cells with Excel comments
-if excel_comments:
-    # Parse the HTML and add data-comment attributes to cells with Excel comments
-    soup = BeautifulSoup(table_html, 'html.parser')
-    table = soup.find('table')
-    if table:
-        # Find all rows in the table body (skip header)
-        rows = table.find_all('tr')[1:]  # Skip header row
-
-        for row_idx, row in enumerate(rows):
-            # Get the particulars value from the first cell (row header)
-            first_cell = row.find('td') or row.find('th')
-            if first_cell:
-                particular_text = first_cell.get_text(strip=True)
-                if particular_text == 'PARTICULARS':
-                    continue  # Skip the header row
-
-                # Find all data cells in this row
-                data_cells = row.find_all('td')[1:]  # Skip the particulars cell
-
-                for col_idx, cell in enumerate(data_cells):
-                    # Get the column name from the header
-                    header_row = table.find('tr')
-                    if header_row:
-                        headers = header_row.find_all(['th', 'td'])
-                        if col_idx + 1 < len(headers):  # +1 because we skip the particulars column
-                            col_name = headers[col_idx + 1].get_text(strip=True)
-                            
-                            # Apply same string formatting as in comment mapping
-                            try:
-                                # Try to parse as datetime and convert back to string
-                                parsed_date = pd.to_datetime(col_name, errors='coerce')
-                                if not pd.isnull(parsed_date):
-                                    col_name = parsed_date.strftime('%Y-%m-%d')
-                            except:
-                                pass
-                            
-                            # Normalize the key
-                            particular_text_norm = particular_text.strip().lower()
-                            col_name_norm = col_name.strip().lower()
-                            cell_key = f"{particular_text_norm}|{col_name_norm}"
-                            
-                            if cell_key in excel_comments:
-                                # Add the Excel comment as a data attribute
-                                comment_text = excel_comments[cell_key]
-                                cell['data-comment'] = comment_text
-                                # Also add title attribute as fallback
-                                cell['title'] = comment_text
-
-    # Convert back to string
-    table_html = str(soup)
-
-    # Add CSS for Excel comment tooltips
-    st.markdown("""
-    <style>
-    /* Tooltip styling for cells with Excel comments */
-    .freeze-header-table-container td[data-comment] {
-        position: relative !important;
-        cursor: help !important;
-    }
-
-    .freeze-header-table-container td[data-comment]:hover::after {
-        content: attr(data-comment);
-        position: absolute !important;
-        background: rgba(70, 130, 180, 0.95) !important;
-        color: white !important;
-        padding: 10px 15px !important;
-        border-radius: 8px !important;
-        font-size: 13px !important;
-        font-family: Arial, sans-serif !important;
-        white-space: pre-wrap !important;
-        max-width: 350px !important;
-        min-width: 200px !important;
-        z-index: 1000 !important;
-        bottom: 100% !important;
-        left: 50% !important;
-        transform: translateX(-50%) !important;
-        margin-bottom: 8px !important;
-        box-shadow: 0 4px 12px rgba(0,0,0,0.4) !important;
-        pointer-events: none !important;
-        line-height: 1.4 !important;
-    }
-
-    /* Add a small indicator that this cell has an Excel comment */
-    .freeze-header-table-container td[data-comment]::before {
-        content: "💬";
-        position: absolute !important;
-        top: 2px !important;
-        right: 2px !important;
-        font-size: 10px !important;
-        opacity: 0.7 !important;
-        z-index: 1 !important;
-        color: #FF6347 !important;
-    }
-    </style>
-    """, unsafe_allow_html=True)
-
-st.markdown(
-    f'<div class="freeze-header-table-container">{table_html}</div>',
-    unsafe_allow_html=True
-)
-
-# Summary Reports & Charts
-st.markdown("---")
-st.header("Summary Reports & Charts")
-
-# KPI Tiles for latest month (selected branch only)
-branch_df = sheets_data_str[branch_option]
-
-# Identify month columns (exclude non-month columns)
-non_month_cols = ['PARTICULARS', 'Branch', 'Month']
-month_cols = [col for col in branch_df.columns if col not in non_month_cols]
-
-# Try to parse columns as dates and find the latest
-month_col_dates = []
-for col in month_cols:
-    try:
-        dt = pd.to_datetime(col, format='%b-%y', errors='coerce')
-        if not pd.isnull(dt):
-            month_col_dates.append((col, dt))
-    except Exception:
-        continue
-if month_col_dates:
-    # Sort and pick the latest
-    month_col_dates.sort(key=lambda x: x[1])
-    latest_month_col, latest_month_dt = month_col_dates[-1]
-    # KPIs and their row labels
-    kpi_labels = [
-        ('Total Sales and Service Charge', 'TOTAL SALES AND SERVICE CHARGES'),
-        ('Net Food Cost', 'NET FOOD COST'),
-        ('Net Drink Cost', 'NET DRINK COST'),
-        ('Gross Profit', 'GROSS PROFIT'),
-        ('Total Non Operating Cost', 'TOTAL NON OPERATING COST'),
-        ('Net Profit', 'NET PROFIT'),
-    ]
-    kpi_results = []
-    for kpi_name, row_label in kpi_labels:
-        row = branch_df[branch_df['PARTICULARS'].str.strip().str.upper() == row_label]
-        if not row.empty and latest_month_col in row.columns:
-            value = row[latest_month_col].values[0]
-            if value is not None and value != '' and value != 0:
-                try:
-                    value_fmt = indian_number_format(value)
-                except Exception:
-                    value_fmt = str(value)
-            else:
-                value_fmt = '-'
-        else:
-            value_fmt = '-'
-        kpi_results.append((kpi_name, value_fmt))
-    # Show tiles: 3 per row, smaller, colored
-    st.markdown(f'#### Latest Month KPIs ({latest_month_col})')
-    colors = [
-        '#e3f2fd', '#fff9c4', '#ffe0b2', '#c8e6c9', '#f8bbd0', '#d1c4e9'
-    ]
-    tile_html = """
-    <style>
-    .kpi-row {{ display: flex; flex-wrap: wrap; gap: 1rem; margin-bottom: 1rem; }}
-    .kpi-tile {{
-        flex: 1 1 calc(33% - 1rem);
-        min-width: 180px;
-        background: {bg};
-        border-radius: 12px;
-        padding: 0.7rem 0.5rem 0.5rem 0.5rem;
-        box-shadow: 0 2px 8px rgba(0,0,0,0.04);
-        text-align: center;
-        margin-bottom: 0.5rem;
-    }}
-    .kpi-label {{ font-size: 1rem; color: #333; margin-bottom: 0.2rem; font-weight: 600; }}
-    .kpi-value {{ font-size: 1.5rem; color: #003366; font-weight: bold; letter-spacing: 1px; }}
-    @media (max-width: 800px) {{
-        .kpi-tile {{ flex: 1 1 100%; min-width: 140px; }}
-    }}
-    </style>
-    <div class="kpi-row">
-    {tiles}
-    </div>
-    """
-    tiles = ""
-    for idx, (kpi_name, value_fmt) in enumerate(kpi_results):
-        bg = colors[idx % len(colors)]
-        tiles += f'<div class="kpi-tile" style="background:{bg}"><div class="kpi-label">{kpi_name}</div><div class="kpi-value">{value_fmt}</div></div>'
-    st.markdown(tile_html.format(tiles=tiles, bg='{bg}'), unsafe_allow_html=True)
-
-# Niko Sales Trend
-if 'Sale' in full_df.columns and 'Month' in full_df.columns:
-    fig_sales = px.line(full_df, x='Month', y='Sale', title="Niko Monthly Sales Trend")
-    st.plotly_chart(fig_sales, use_container_width=True)
-
-# Niko Profit Trend
-if 'Month' in full_df.columns and 'Profit' in full_df.columns:
-    fig_profit = px.line(full_df, x='Month', y='Profit', title="Niko Monthly Profit Trend")
-    st.plotly_chart(fig_profit, use_container_width=True)
+        with st.sidebar.expander('Profile', expanded=False):
+            st.dataframe(profiler.summary(), hide_index=True)
+            st.dataframe([{'cache': name, **stats} for name, stats in cache_stats.items()], hide_index=True)
+        profiler.flush(branch=branch_option, event='page', caches=cache_stats)
+    page_logged = True
+finally:
+    profiler.close()
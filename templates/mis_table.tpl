@@ -0,0 +1,10 @@
+{% extends "html_table.tpl" %}
+{# Body cells carry their Excel comment (already escaped) as data-comment/title #}
+{% block tr %}
+    <tr>
+{% for c in r %}{% if c.is_visible != False %}
+{% set comment = cell_comments.get(c.id) if (cell_comments and c.id is defined) else None %}
+      <{{c.type}} {%- if c.id is defined %} id="T_{{uuid}}_{{c.id}}" {%- endif %} class="{{c.class}}" {{c.attributes}}{% if comment %} data-comment="{{ comment }}" title="{{ comment }}"{% endif %}>{{c.display_value}}</{{c.type}}>
+{% endif %}{% endfor %}
+    </tr>
+{% endblock tr %}